@@ -0,0 +1,31 @@
+"""add_report_persons_link_person_index
+
+Revision ID: 3f6d2a9c1b47
+Revises: eeb05834e0b5
+Create Date: 2026-10-15 10:12:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d2a9c1b47'
+down_revision: Union[str, Sequence[str], None] = 'eeb05834e0b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so writes to report_persons_link are not blocked while the index is created
+    with op.get_context().autocommit_block():
+        op.create_index('ix_report_persons_link_person_id_report_id', 'report_persons_link', ['person_id', 'report_id'], unique=False, postgresql_include=['role'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_report_persons_link_person_id_report_id', table_name='report_persons_link', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add_messages_conversation_index
+
+Revision ID: b7e41d0c9a23
+Revises: 3f6d2a9c1b47
+Create Date: 2026-10-15 23:58:06.114382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d0c9a23'
+down_revision: Union[str, Sequence[str], None] = '3f6d2a9c1b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so writes to messages are not blocked while the index is created
+    with op.get_context().autocommit_block():
+        op.create_index('ix_messages_conversation_id_message_id', 'messages', ['conversation_id', 'message_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_conversation_id_message_id', table_name='messages', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add_users_email_login_index
+
+Revision ID: d2a8f3b6e514
+Revises: b7e41d0c9a23
+Create Date: 2026-10-16 00:31:47.208915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f3b6e514'
+down_revision: Union[str, Sequence[str], None] = 'b7e41d0c9a23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Unique covering index: the only index on users.email, serving both duplicate checks and logins
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email_login', 'users', ['email'], unique=True, postgresql_include=['user_id', 'password', 'role', 'status'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_login', table_name='users', postgresql_concurrently=True)
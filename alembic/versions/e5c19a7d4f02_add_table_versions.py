@@ -0,0 +1,57 @@
+"""add_table_versions
+
+Revision ID: e5c19a7d4f02
+Revises: d2a8f3b6e514
+Create Date: 2026-10-16 14:05:22.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c19a7d4f02'
+down_revision: Union[str, Sequence[str], None] = 'd2a8f3b6e514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose writes invalidate cached list responses
+TRACKED_TABLES = ('scam_reports', 'report_persons_link', 'person_details', 'users')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('table_versions',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(
+        sa.table('table_versions', sa.column('table_name', sa.String())),
+        [{'table_name': name} for name in TRACKED_TABLES],
+    )
+    # The bump runs inside the writing transaction, so the new version becomes visible exactly when the write
+    # commits. Concurrent writers to one table queue on its counter row until the earlier one commits.
+    op.execute("""
+        CREATE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$
+    """)
+    for name in TRACKED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {name}_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {name} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}_bump_version ON {name}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table('table_versions')
@@ -0,0 +1,83 @@
+import hashlib
+import threading
+import time
+from typing import Dict, Final, Hashable, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import Select, select
+
+from src.models.data_model import TableVersions
+
+# In-process cache of rendered GET list responses, keyed by (namespace, *query params).
+# Each worker holds its own copy: a write drops the affected namespaces in the worker that
+# served it, and other workers converge within RESPONSE_CACHE_TTL seconds. Endpoints that
+# also put the table_versions counters in the key (reports, users, persons) see other workers'
+# writes on the next request after they commit.
+RESPONSE_CACHE_TTL: Final = 60
+RESPONSE_CACHE_MAXSIZE: Final = 512
+_response_cache: Dict[Tuple[Hashable, ...], Tuple[bytes, float]] = {}
+_response_cache_lock = threading.Lock()
+
+# Clients may keep a page but must revalidate it (If-None-Match) before every reuse
+REVALIDATE_CACHE_CONTROL: Final = "private, max-age=0, must-revalidate"
+
+def get_cached_response(key: Tuple[Hashable, ...]) -> Optional[Response]:
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        body, expires_at = entry
+        if expires_at <= time.time():
+            del _response_cache[key]
+            return None
+    return Response(content=body, media_type="application/json")
+
+def cache_body(key: Tuple[Hashable, ...], body: bytes) -> None:
+    expires_at = time.time() + RESPONSE_CACHE_TTL
+    with _response_cache_lock:
+        if len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+            _response_cache.clear()
+        _response_cache[key] = (body, expires_at)
+
+def cache_response(key: Tuple[Hashable, ...], response: Response) -> Response:
+    cache_body(key, response.body)
+    return response
+
+def invalidate_responses(*namespaces: str) -> None:
+    """Drop cached responses for the given namespaces (e.g. 'reports') after a write."""
+    with _response_cache_lock:
+        for key in [k for k in _response_cache if k[0] in namespaces]:
+            del _response_cache[key]
+
+def table_versions_stmt(*models) -> Select:
+    """
+    Write counters for the given tables, for a list endpoint's cache key: primary key lookups on table_versions,
+    whose triggers bump each counter in the same transaction as the write.
+    """
+    return (
+        select(TableVersions.version)
+        .where(TableVersions.table_name.in_([model.__tablename__ for model in models]))
+        .order_by(TableVersions.table_name)
+    )
+
+def make_etag(key: Tuple[Hashable, ...]) -> str:
+    """Weak ETag for a cache key that includes table_versions counters; stable across workers and restarts."""
+    return 'W/"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+
+def not_modified(if_none_match: Optional[str], etag: str) -> Optional[Response]:
+    """304 response if the client's If-None-Match already names this ETag, else None."""
+    if if_none_match is None:
+        return None
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    if etag not in candidates and "*" not in candidates:
+        return None
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return response
+
+def clear_response_cache() -> None:
+    with _response_cache_lock:
+        _response_cache.clear()
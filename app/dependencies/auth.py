@@ -1,82 +1,203 @@
+import hashlib
 import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
-from typing import Optional
+import threading
+import time
+import anyio
+from functools import lru_cache
+from typing import Dict, Final, NamedTuple, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import timedelta
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import jwt
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.dependencies.db import db_dependency 
-from src.models.data_model import Users, UserStatus  
+from src.models.data_model import Users, UserRole, UserStatus  
 from app.model import TokenData  
 from config.settings import get_settings  
 
 
 settings = get_settings()
-SECRET_KEY = settings.secret_key 
-ALGORITHM = "HS256"
+SECRET_KEY: Final[str] = settings.secret_key 
+SECRET_KEY_BYTES: Final[bytes] = SECRET_KEY.encode("utf-8")
+ALGORITHM: Final = "HS256"
+DEFAULT_TOKEN_EXPIRE_SECONDS: Final = 15 * 60
+# Only signature, exp and sub matter for our tokens; built once rather than per decode
+_JWT_OPTIONS = {"require": ["exp", "sub"], "verify_aud": False, "verify_iss": False}
+# Password hashing is CPU- and memory-heavy (argon2 uses ~19 MiB per call). Callers already run in worker
+# threads, so cap how many hash at once to the core count; a login burst queues instead of oversubscribing.
+_hash_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def _pwd_context():
+    """
+    Build the password hashing context on first use so importing this module stays cheap.
+    New hashes use argon2id; existing bcrypt hashes still verify and are upgraded on next login.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__time_cost=2,
+        argon2__memory_cost=19456,
+        argon2__parallelism=1,
+        bcrypt__rounds=10,
+    )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+class AuthPrincipal(NamedTuple):
+    """Columns of the authenticated user needed for role and status checks."""
+    user_id: int
+    email: str
+    role: UserRole
+    status: UserStatus
+
+class LoginRow(NamedTuple):
+    """Columns needed to verify a login and issue its token; no full Users entity is loaded."""
+    user_id: int
+    email: str
+    password: str
+    role: UserRole
+    status: UserStatus
+
+# Built once so every auth lookup reuses the same compiled SQL from the engine cache.
+# Both email lookups are index-only scans on ix_users_email_login.
+LOGIN_BY_EMAIL_STMT = select(Users.user_id, Users.email, Users.password, Users.role, Users.status).where(Users.email == bindparam("email"))
+PRINCIPAL_BY_EMAIL_STMT = select(Users.user_id, Users.email, Users.role, Users.status).where(Users.email == bindparam("email"))
+USER_BY_ID_STMT = select(Users).where(Users.user_id == bindparam("user_id"))
+
+# Validated tokens -> (principal, expiry epoch). Entries live until the token's own exp,
+# capped at TOKEN_CACHE_TTL so status changes are picked up within a minute.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAXSIZE = 4096
+_token_cache: Dict[bytes, Tuple[AuthPrincipal, float]] = {}
+_token_cache_lock = threading.Lock()
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _get_cached_principal(key: bytes) -> Optional[AuthPrincipal]:
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[key]
+            return None
+        return principal
+
+def _cache_principal(key: bytes, principal: AuthPrincipal, exp: float) -> None:
+    expires_at = min(exp, time.time() + TOKEN_CACHE_TTL)
+    with _token_cache_lock:
+        if len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+            now = time.time()
+            for stale in [k for k, (_, e) in _token_cache.items() if e <= now]:
+                del _token_cache[stale]
+            if len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+                _token_cache.clear()
+        _token_cache[key] = (principal, expires_at)
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    with _hash_slots:
+        return _pwd_context().hash(password)
+
+def _fetch_login_row(db, email: str) -> Optional[LoginRow]:
+    row = db.execute(LOGIN_BY_EMAIL_STMT, {"email": email}).first()
+    return LoginRow(*row) if row is not None else None
+
+def _fetch_principal_by_email(db, email: str) -> Optional[AuthPrincipal]:
+    row = db.execute(PRINCIPAL_BY_EMAIL_STMT, {"email": email}).first()
+    return AuthPrincipal(*row) if row is not None else None
 
 def authenticate_user(email: str, password: str, db: db_dependency):
     try: 
-        user = db.query(Users).filter(Users.email == email).first()
+        user = _fetch_login_row(db, email)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during authentication: {str(e)}")
     
     if not user:
         return False
-    if not verify_password(password, user.password):
+    with _hash_slots:
+        verified, new_hash = _pwd_context().verify_and_update(password, user.password)
+    if not verified:
         return False
+    if new_hash:
+        try:
+            db.execute(update(Users).where(Users.user_id == user.user_id).values(password=new_hash))
+            db.commit()
+        except SQLAlchemyError:
+            # Rehash is best-effort; the old hash remains valid
+            db.rollback()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # Epoch seconds directly; avoids building datetimes that are only serialized back to an int
+    expires_in = int(expires_delta.total_seconds()) if expires_delta else DEFAULT_TOKEN_EXPIRE_SECONDS
+    to_encode["exp"] = int(time.time()) + expires_in
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY_BYTES, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(db: db_dependency, token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: db_dependency, token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cache_key = _token_key(token)
+    cached_principal = _get_cached_principal(cache_key)
+    if cached_principal is not None:
+        return cached_principal
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY_BYTES, algorithms=[ALGORITHM], options=_JWT_OPTIONS)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)  
-    except JWTError:
+        # sub was validated at signup; skip re-validating it on every request
+        token_data = TokenData.model_construct(email=email)
+    except jwt.InvalidTokenError:
         raise credentials_exception
     try: 
-        user = db.query(Users).filter(Users.email == token_data.email).first()
+        principal = await anyio.to_thread.run_sync(_fetch_principal_by_email, db, token_data.email)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during user retrieval: {str(e)}")
     
-    if user is None:
+    if principal is None:
         raise credentials_exception
-    return user
 
-def get_current_active_user(current_user: Users = Depends(get_current_user)):
+    _cache_principal(cache_key, principal, float(payload["exp"]))
+    return principal
+
+async def get_current_active_user(current_user: AuthPrincipal = Depends(get_current_user)):
     if current_user.status != UserStatus.active:  
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def _fetch_user_by_id(db, user_id: int) -> Optional[Users]:
+    return db.execute(USER_BY_ID_STMT, {"user_id": user_id}).scalars().first()
+
+async def get_current_user_profile(db: db_dependency, current_user: AuthPrincipal = Depends(get_current_active_user)):
+    """
+    Load the full Users row for the authenticated user.
+    Only for endpoints that need profile fields beyond the auth principal.
+    """
+    try:
+        user = await anyio.to_thread.run_sync(_fetch_user_by_id, db, current_user.user_id)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error during user retrieval: {str(e)}")
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
\ No newline at end of file
@@ -1,41 +1,27 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
 from fastapi import Depends, HTTPException
 
-from app.dependencies.db import db_dependency  
-from app.dependencies.auth import get_current_active_user  
-from src.models.data_model import Users, UserRole  
+from app.dependencies.auth import AuthPrincipal, get_current_active_user  
+from src.models.data_model import UserRole  
 
-def admin_role(db: db_dependency, current_user: Users = Depends(get_current_active_user)):
+def require_role(role: UserRole, role_label: str):
     """
-    Dependency to check if the current user has ADMIN role.
-    Raises 403 if not. Use this in router endpoints for admin-only access.
+    Build a dependency that checks the current user has the given role.
+    Raises 403 if not. Only compares the already-resolved principal, so no DB session is needed.
     """
-    if current_user.role != UserRole.admin:
-        raise HTTPException(status_code=403, detail="Unauthorized: Admin access required")
-    return current_user
+    async def _check_role(current_user: AuthPrincipal = Depends(get_current_active_user)):
+        if current_user.role != role:
+            raise HTTPException(status_code=403, detail=f"Unauthorized: {role_label} access required")
+        return current_user
+    return _check_role
 
-def io_role(db: db_dependency, current_user: Users = Depends(get_current_active_user)):
-    """
-    Dependency to check if the current user has INVESTIGATION OFFICER role.
-    Raises 403 if not. Use this for IO-specific endpoints.
-    """
-    if current_user.role != UserRole.io:
-        raise HTTPException(status_code=403, detail="Unauthorized: Investigation Officer access required")
-    return current_user
-
-def analyst_role(db: db_dependency, current_user: Users = Depends(get_current_active_user)):
-    """
-    Dependency to check if the current user has ANALYST role.
-    Raises 403 if not. Use this for analyst-specific endpoints.
-    """
-    if current_user.role != UserRole.analyst:
-        raise HTTPException(status_code=403, detail="Unauthorized: Analyst access required")
-    return current_user
+# Admin-only endpoints
+admin_role = require_role(UserRole.admin, "Admin")
+# Investigation Officer endpoints
+io_role = require_role(UserRole.io, "Investigation Officer")
+# Analyst endpoints
+analyst_role = require_role(UserRole.analyst, "Analyst")
 
-def any_role(db: db_dependency, current_user: Users = Depends(get_current_active_user)):
+async def any_role(current_user: AuthPrincipal = Depends(get_current_active_user)):
     """
     Dependency to allow any active authenticated user.
     Useful for endpoints that don't require a specific role but need login.
@@ -0,0 +1,22 @@
+import threading
+from typing import Optional
+
+from src.database.database_operations import db_manager
+from src.database.vector_operations import VectorStore
+
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Shared VectorStore for the report routers.
+    Built on first use (it loads the embedding model) and reused for every later request. Sync endpoints
+    resolve this from the threadpool, so construction is locked to load the model only once.
+    """
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStore(db_manager.session_factory)
+    return _vector_store
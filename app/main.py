@@ -1,6 +1,4 @@
 import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,8 +10,10 @@ from app.routers.reports import reports_router
 from app.routers.users import users_router
 from app.routers.chat import chat_router
 from app.routers.public_reports import public_reports_router
+from app.responses import ORJSONResponse
 
-app = FastAPI(title="Persona Based Conversational AI Agent")
+# Routes with a response_model keep FastAPI's Pydantic-core fast path; the default only applies to the rest
+app = FastAPI(title="Persona Based Conversational AI Agent", default_response_class=ORJSONResponse)
    
 app.add_middleware(
     CORSMiddleware,
@@ -33,4 +33,5 @@ app.include_router(chat_router)
 app.include_router(public_reports_router)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    # Run from the repository root: python -m app.main
+    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -1,23 +1,57 @@
-from pydantic import BaseModel, Field, EmailStr, field_validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, StringConstraints, ValidationInfo, field_serializer, field_validator, model_validator
+import re
+from functools import lru_cache
+from typing import Annotated, Any, Literal
 from datetime import datetime, date
-from enum import Enum
 
-class PersonRole(str, Enum):
-    victim = "victim"
-    suspect = "suspect"
-    witness = "witness"
-    reportee = "reportee"
+from src.models import data_model as db_models
+
+# API-facing value sets. Literal validation is cheaper than enum coercion; the enums live in the DB layer.
+PersonRole = Literal["victim", "suspect", "witness", "reportee"]
+
+_date_today = date.today
+_VALID_SEX: frozenset[str] = frozenset({"MALE", "FEMALE", "OTHER"})
+_PUBLIC_CONTACT_RE = re.compile(r"\+?[0-9]{8,}")
+# Syntactic email check only (no IDNA/deliverability parsing)
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+
+def _check_email(v: str) -> str:
+    if not _EMAIL_RE.fullmatch(v):
+        raise ValueError('Invalid email address')
+    return v
+
+@lru_cache(maxsize=4096)
+def _norm_name(v: str) -> str:
+    """Strip and upper-case a name; memoized since the same names recur across submissions."""
+    return v.strip().upper()
+
+def _blank_to_none(v: Any) -> Any:
+    return None if v == "" else v
+
+# Checked inside pydantic-core rather than by Python validators
+UserName = Annotated[str, StringConstraints(strip_whitespace=True, to_upper=True, min_length=2)]
+UserContactNo = Annotated[str, StringConstraints(pattern=r"^[0-9]{8,12}$")]
+UpperStr = Annotated[str, StringConstraints(to_upper=True)]
+
+# ISO dates are parsed by pydantic-core; forms send "" for an empty date, which means unset
+OptionalDate = Annotated[date | None, BeforeValidator(_blank_to_none)]
 
 class LinkedPerson(BaseModel):
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
     id: str = Field(..., description="Person ID as string")
     name: str = Field(..., description="Full name")
     role: PersonRole
     
 class LinkedReport(BaseModel):  
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
     report_id: str
     role: str
 
+class LinkedReportsBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=500, description="Person IDs to fetch linked reports for")
+
 class LinkedPersonCreate(BaseModel):
     person_id: int
     role: str  
@@ -27,12 +61,17 @@ class IOOption(BaseModel):
     full_name: str
 
 class IOListResponse(BaseModel):
-    ios: List[IOOption]
+    ios: list[IOOption]
     
-class ReportStatus(str, Enum):
-    unassigned = "Unassigned"
-    assigned = "Assigned"
-    resolved = "Resolved"
+ReportStatus = Literal["Unassigned", "Assigned", "Resolved"]
+
+# DB enum member -> API label, computed once instead of per row ('VICTIM' -> 'victim', 'UNASSIGNED' -> 'Unassigned')
+PERSON_ROLE_LABELS: dict[db_models.PersonRole, PersonRole] = {m: m.value.lower() for m in db_models.PersonRole}
+REPORT_STATUS_LABELS: dict[db_models.ReportStatus, ReportStatus] = {m: m.value.capitalize() for m in db_models.ReportStatus}
+
+# Upper-cased request value -> DB enum member, for case-insensitive role/status parsing in the users and auth routers
+USER_ROLES_BY_NAME: dict[str, db_models.UserRole] = {m.value.upper(): m for m in db_models.UserRole}
+USER_STATUSES_BY_NAME: dict[str, db_models.UserStatus] = {m.value.upper(): m for m in db_models.UserStatus}
 
 class ScamReportResponse(BaseModel):
     report_id: int = Field(..., alias="report_id", description="Report ID as string")
@@ -51,204 +90,265 @@ class ScamReportResponse(BaseModel):
     scam_amount_lost: float | None
     scam_incident_description: str | None
     status: ReportStatus
-    assigned_IO_id: Optional[int] = None
+    assigned_IO_id: int | None = None
     assigned_IO: str | None = Field(..., description="IO full name or empty string")
-    linked_persons: List[LinkedPerson] = Field(default_factory=list)
+    linked_persons: tuple[LinkedPerson, ...] = ()
+
+    @classmethod
+    def from_joined_rows(cls, report_row: Any, io_id: int | None, io_name: str | None, person_rows: list[tuple]) -> "ScamReportResponse":
+        """
+        Build a response from a report row (ScamReports entity or Core row) and its already-fetched
+        assigned IO and linked persons, skipping validation. person_rows are (person_id, full_name, role)
+        tuples fetched in one batched query, so listing N reports never lazy-loads per report.
+        """
+        return cls.model_construct(
+            report_id=report_row.report_id,
+            scam_incident_date=report_row.scam_incident_date,
+            scam_report_date=report_row.scam_report_date,
+            scam_type=report_row.scam_type,
+            scam_approach_platform=report_row.scam_approach_platform,
+            scam_communication_platform=report_row.scam_communication_platform,
+            scam_transaction_type=report_row.scam_transaction_type,
+            scam_beneficiary_platform=report_row.scam_beneficiary_platform,
+            scam_beneficiary_identifier=report_row.scam_beneficiary_identifier,
+            scam_contact_no=report_row.scam_contact_no,
+            scam_email=report_row.scam_email,
+            scam_moniker=report_row.scam_moniker,
+            scam_url_link=report_row.scam_url_link,
+            scam_amount_lost=report_row.scam_amount_lost,
+            scam_incident_description=report_row.scam_incident_description,
+            status=REPORT_STATUS_LABELS[report_row.status],
+            assigned_IO_id=io_id,
+            assigned_IO=io_name or "",
+            linked_persons=tuple(
+                LinkedPerson.model_construct(
+                    id=str(person_id),
+                    name=full_name,
+                    role=PERSON_ROLE_LABELS[role]
+                ) for person_id, full_name, role in person_rows
+            )
+        )
     
     
     
 class ReportRequest(BaseModel):
-    scam_incident_date: Optional[str] = None 
-    scam_report_date: Optional[str] = None 
-    scam_type: Optional[str] = None
-    scam_approach_platform: Optional[str] = None
-    scam_communication_platform: Optional[str] = None
-    scam_transaction_type: Optional[str] = None
-    scam_beneficiary_platform: Optional[str] = None
-    scam_beneficiary_identifier: Optional[str] = None
-    scam_contact_no: Optional[str] = None
-    scam_email: Optional[str] = None
-    scam_moniker: Optional[str] = None
-    scam_url_link: Optional[str] = None
-    scam_amount_lost: Optional[float] = None
-    scam_incident_description: Optional[str] = None
-    status: Optional[str] = None  
-    io_in_charge: Optional[int] = None  
+    model_config = ConfigDict(defer_build=True)
+
+    scam_incident_date: OptionalDate = None 
+    scam_report_date: OptionalDate = None 
+    # Categorical fields and status are stored upper-cased; pydantic-core normalizes them on the way in
+    scam_type: UpperStr | None = None
+    scam_approach_platform: UpperStr | None = None
+    scam_communication_platform: UpperStr | None = None
+    scam_transaction_type: UpperStr | None = None
+    scam_beneficiary_platform: UpperStr | None = None
+    scam_beneficiary_identifier: UpperStr | None = None
+    scam_contact_no: str | None = None
+    scam_email: str | None = None
+    scam_moniker: str | None = None
+    scam_url_link: str | None = None
+    scam_amount_lost: float | None = None
+    scam_incident_description: str | None = None
+    status: UpperStr | None = None  
+    io_in_charge: int | None = None  
     
     
 class ScamReportListResponse(BaseModel):
-    reports: List[ScamReportResponse]
+    model_config = ConfigDict(defer_build=True)
 
+    reports: list[ScamReportResponse]
+    next_cursor: int | None = None  # Pass as after_id to fetch the next page; None on the last page
 
 
 
-class PersonResponse(BaseModel):
-    person_id: int = Field(..., description="Unique person ID (use this as key)")
+
+# Shared field blocks for person-like models. List _AddressFields first in the bases so the
+# person fields come first in the schema (pydantic orders inherited fields by reversed MRO).
+class _PersonFields(BaseModel):
     first_name: str
     last_name: str
     sex: str | None
     dob: date | None
     nationality: str | None
     race: str | None
-    occupation: str | None
-    contact_no: str
-    email: str
+
+class _AddressFields(BaseModel):
     blk: str | None
     street: str | None
     unit_no: str | None
-    postcode: str  | None
+    postcode: str | None
+
+class _OptionalPersonFields(BaseModel):
+    first_name: str | None = None
+    last_name: str | None = None
+    sex: str | None = None
+    dob: OptionalDate = None
+    nationality: str | None = None
+    race: str | None = None
+
+class _OptionalAddressFields(BaseModel):
+    blk: str | None = None
+    street: str | None = None
+    unit_no: str | None = None
+    postcode: str | None = None
+
+class PersonResponse(_AddressFields, _PersonFields):
+    person_id: int = Field(..., description="Unique person ID (use this as key)")
+    occupation: str | None
+    contact_no: str
+    email: str
 
 class PersonListResponse(BaseModel):
-    persons: List[PersonResponse]
-
-class PersonRequest(BaseModel):
-    first_name: Optional[str] = None
-    last_name: Optional[str] = None
-    sex: Optional[str] = None
-    dob: Optional[str] = None 
-    nationality: Optional[str] = None
-    race: Optional[str] = None
-    occupation: Optional[str] = None
-    contact_no: Optional[str] = None
-    email: Optional[str] = None
-    blk: Optional[str] = None
-    street: Optional[str] = None
-    unit_no: Optional[str] = None
-    postcode: Optional[str] = None
-
-
-
-class UserRole(str, Enum):
-    admin = "ADMIN"
-    io = "INVESTIGATION OFFICER"
-    analyst = "ANALYST"
-
-class UserStatus(str, Enum):
-    pending = "PENDING"
-    active = "ACTIVE"
-    inactive = "INACTIVE"
-
-class UserResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    persons: list[PersonResponse]
+    next_cursor: int | None = None
+
+class PersonRequest(_OptionalAddressFields, _OptionalPersonFields):
+    occupation: str | None = None
+    contact_no: str | None = None
+    email: str | None = None
+
+
+
+UserRole = Literal["ADMIN", "INVESTIGATION OFFICER", "ANALYST"]
+
+UserStatus = Literal["PENDING", "ACTIVE", "INACTIVE"]
+
+class UserResponse(_AddressFields, _PersonFields):
     user_id: int = Field(..., description="Unique user ID")
-    first_name: str
-    last_name: str
-    sex: str | None
-    dob: date | None
-    nationality: str | None
-    race: str | None
     contact_no: str
     email: str
-    blk: str | None
-    street: str | None
-    unit_no: str | None
-    postcode: str | None
     role: str
     status: str
     registration_datetime: datetime
     last_updated_datetime: datetime
 
 class UserListResponse(BaseModel):
-    users: List[UserResponse]
-
-class UserRequest(BaseModel):
-    password: Optional[str] = None
-    first_name: Optional[str] = None
-    last_name: Optional[str] = None
-    sex: Optional[str] = None
-    dob: Optional[str] = None  
-    nationality: Optional[str] = None
-    race: Optional[str] = None
-    contact_no: Optional[str] = None
-    email: Optional[str] = None
-    blk: Optional[str] = None
-    street: Optional[str] = None
-    unit_no: Optional[str] = None
-    postcode: Optional[str] = None
-    role: Optional[str] = None
-    status: Optional[str] = None
-
+    model_config = ConfigDict(defer_build=True)
+
+    users: list[UserResponse]
+    next_cursor: int | None = None
+
+class UserRequest(_OptionalAddressFields, _OptionalPersonFields):
+    # Names, address, role and status are stored upper-cased; pydantic-core normalizes them on the way in
+    first_name: UpperStr | None = None
+    last_name: UpperStr | None = None
+    sex: UpperStr | None = None
+    nationality: UpperStr | None = None
+    race: UpperStr | None = None
+    blk: UpperStr | None = None
+    street: UpperStr | None = None
+    unit_no: UpperStr | None = None
+    postcode: UpperStr | None = None
+    password: str | None = None
+    contact_no: str | None = None
+    email: str | None = None
+    role: UpperStr | None = None
+    status: UpperStr | None = None
+
+
+def _format_frontend_date(v: datetime) -> str:
+    """Timestamp format expected by the frontend ('dd/mm/yy HH:MM', e.g. '31/01/24 13:45'), without strftime's per-call format parsing."""
+    return f"{v.day:02d}/{v.month:02d}/{v.year % 100:02d} {v.hour:02d}:{v.minute:02d}"
 
 class FrontendMessage(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra='forbid', frozen=True)
+
     messageId: str
     conversationId: str
     senderRole: str  # "Human" or "AI"
     content: str
-    sentDate: str  
+    sentDate: datetime
+
+    @field_serializer('sentDate')
+    def serialize_sent_date(self, v: datetime) -> str:
+        return _format_frontend_date(v)
 
 class FrontendConversation(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     conversationId: str
-    reportId: Optional[str]
-    creationDate: str  
-    messages: List[FrontendMessage]
+    reportId: str | None
+    creationDate: datetime
+    messages: list[FrontendMessage]
     summary: str  
 
+    @field_serializer('creationDate')
+    def serialize_creation_date(self, v: datetime) -> str:
+        return _format_frontend_date(v)
+
 class ConversationListResponse(BaseModel):
-    conversations: List[FrontendConversation]
+    model_config = ConfigDict(defer_build=True)
+
+    conversations: list[FrontendConversation]
+    next_cursor: int | None = None
 
 
-class PublicReportSubmission(BaseModel):
+class PublicReportSubmission(_OptionalAddressFields):
     first_name: str
     last_name: str
     contact_no: str
-    email: EmailStr
-    sex: Optional[str] = None
-    dob: Optional[str] = None
-    nationality: Optional[str] = None
-    race: Optional[str] = None
-    occupation: Optional[str] = None
-    blk: Optional[str] = None
-    street: Optional[str] = None
-    unit_no: Optional[str] = None
-    postcode: Optional[str] = None
-    role: Optional[str] = "reportee"
-
-    scam_incident_date: str
-    scam_report_date: Optional[str] = None
-    scam_type: Optional[str] = None
-    scam_approach_platform: Optional[str] = None
-    scam_communication_platform: Optional[str] = None
-    scam_transaction_type: Optional[str] = None
-    scam_beneficiary_platform: Optional[str] = None
-    scam_beneficiary_identifier: Optional[str] = None
-    scam_contact_no: Optional[str] = None
-    scam_email: Optional[str] = None
-    scam_moniker: Optional[str] = None
-    scam_url_link: Optional[str] = None
-    scam_amount_lost: Optional[float] = None
+    email: str
+    sex: str | None = None
+    dob: OptionalDate = None
+    nationality: str | None = None
+    race: str | None = None
+    occupation: str | None = None
+    role: str | None = "reportee"
+
+    scam_incident_date: date
+    scam_report_date: OptionalDate = None
+    scam_type: str | None = None
+    scam_approach_platform: str | None = None
+    scam_communication_platform: str | None = None
+    scam_transaction_type: str | None = None
+    scam_beneficiary_platform: str | None = None
+    scam_beneficiary_identifier: str | None = None
+    scam_contact_no: str | None = None
+    scam_email: str | None = None
+    scam_moniker: str | None = None
+    scam_url_link: str | None = None
+    scam_amount_lost: float | None = None
     scam_incident_description: str
     
-    conversation_id: Optional[int] = None
-
-    @field_validator('first_name', 'last_name')
-    def validate_names(cls, v: str) -> str:
-        v = v.strip().upper()
-        if len(v) < 2:
-            raise ValueError('Name must be at least 2 characters')
-        return v
-
-    @field_validator('contact_no')
-    def validate_contact_no(cls, v: str) -> str:
-        # Strip whitespace
-        v = v.strip()
-        # Check for optional '+' prefix
-        if v.startswith('+'):
-            digits = v[1:]
-        else:
-            digits = v
-        # Validate: digits only, at least 8
-        if not digits.isdigit() or len(digits) < 8:
-            raise ValueError('Contact number must have at least 8 digits (optional + prefix allowed)')
-        return v
-
-    @field_validator('scam_incident_description')
-    def validate_description(cls, v: str) -> str:
-        if not v.strip():
+    conversation_id: int | None = None
+
+    @model_validator(mode='before')
+    @classmethod
+    def normalize_fields(cls, values: Any) -> Any:
+        """Normalize and check names, contact number and description in one pass over the raw input."""
+        if not isinstance(values, dict):
+            return values
+        values = dict(values)
+        for field in ('first_name', 'last_name'):
+            v = values.get(field)
+            if isinstance(v, str):
+                v = _norm_name(v)
+                if len(v) < 2:
+                    raise ValueError('Name must be at least 2 characters')
+                values[field] = v
+
+        email = values.get('email')
+        if isinstance(email, str):
+            _check_email(email)
+
+        contact_no = values.get('contact_no')
+        if isinstance(contact_no, str):
+            # Optional '+' prefix, then digits only, at least 8
+            contact_no = contact_no.strip()
+            if not _PUBLIC_CONTACT_RE.fullmatch(contact_no):
+                raise ValueError('Contact number must have at least 8 digits (optional + prefix allowed)')
+            values['contact_no'] = contact_no
+
+        description = values.get('scam_incident_description')
+        if isinstance(description, str) and not description.strip():
             raise ValueError('Description cannot be empty')
-        return v
+        return values
 
 class PublicReportResponse(BaseModel):
     report_id: int
-    conversation_id: Optional[int]=None
+    conversation_id: int | None=None
     message: str = "Report submitted successfully"
 
 
@@ -260,85 +360,89 @@ class Token(BaseModel):
     token_type: str
 
 class TokenJson(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     token: str
     token_type: str
 
 class SignInRequest(BaseModel):
-    email: EmailStr 
+    email: str 
     password: str
 
+    @field_validator('email', mode='before')
+    def validate_email(cls, v: Any) -> Any:
+        return _check_email(v) if isinstance(v, str) else v
+
 class TokenData(BaseModel):
-    email: Optional[EmailStr] = None  # For JWT payload
+    email: str | None = None  # For JWT payload
+
+    @field_validator('email', mode='before')
+    def validate_email(cls, v: Any) -> Any:
+        return _check_email(v) if isinstance(v, str) else v
 
-class UserIn(BaseModel):  # For signup input
-    email: EmailStr
+class UserIn(_OptionalAddressFields):  # For signup input
+    email: str
     password: str
-    first_name: str 
-    last_name: str  
-    contact_no: str  
-    role: Optional[str] = "INVESTIGATION OFFICER"  
-    sex: Optional[str] = None
-    dob: Optional[str] = None
-    nationality: Optional[str] = None
-    race: Optional[str] = None
-    blk: Optional[str] = None
-    street: Optional[str] = None
-    unit_no: Optional[str] = None
-    postcode: Optional[str] = None
+    first_name: UserName
+    last_name: UserName
+    contact_no: UserContactNo
+    role: str | None = "INVESTIGATION OFFICER"  
+    sex: str | None = None
+    dob: OptionalDate = None
+    nationality: str | None = None
+    race: str | None = None
     
-    @field_validator('password')
-    def validate_password(cls, v: str) -> str:
-        if len(v) < 8:
+    @model_validator(mode='before')
+    @classmethod
+    def normalize_fields(cls, values: Any) -> Any:
+        """
+        Check email, password and sex in one pass over the raw input.
+        """
+        if not isinstance(values, dict):
+            return values
+        values = dict(values)
+        email = values.get('email')
+        if isinstance(email, str):
+            _check_email(email)
+
+        password = values.get('password')
+        if isinstance(password, str) and len(password) < 8:
             raise ValueError('Password must be at least 8 characters')
-        return v
 
-    @field_validator('first_name', 'last_name')
-    def validate_names(cls, v: str) -> str:
-        v = v.strip().upper()  
-        if len(v) < 2:
-            raise ValueError('Name too short (min 2 characters)')
-        return v
-
-    @field_validator('contact_no')
-    def validate_contact_no(cls, v: str) -> str:
-        if not v.isdigit() or not (8 <= len(v) <= 12):
-            raise ValueError('Contact number must be 8-12 digits')
-        return v
-
-    @field_validator('dob', mode='before')  
-    def validate_dob(cls, v: Optional[str]) -> Optional[str]:
-        if v:
-            try:
-                dob_date = datetime.strptime(v, "%Y-%m-%d").date()
-                if dob_date > date.today():
-                    raise ValueError('Date of birth cannot be in the future')
-            except ValueError:
-                raise ValueError('Invalid DOB format (use YYYY-MM-DD)')
-        return v
-
-    @field_validator('sex')
-    def validate_sex(cls, v: Optional[str]) -> Optional[str]:
-        if v:
-            valid = ['MALE', 'FEMALE', 'OTHER'] 
-            if v.upper() not in valid:
-                raise ValueError(f'Invalid sex: must be one of {valid}')
-            return v.upper()  # Standardize
+        sex = values.get('sex')
+        if sex and isinstance(sex, str):
+            sex = sex.upper()  # Standardize
+            if sex not in _VALID_SEX:
+                raise ValueError("Invalid sex: must be one of ['MALE', 'FEMALE', 'OTHER']")
+            values['sex'] = sex
+        return values
+
+    @field_validator('dob')
+    def validate_dob(cls, v: date | None, info: ValidationInfo) -> date | None:
+        # Batch callers can pass context={'today': date} to share one clock read across records
+        today = info.context.get('today') if info.context else None
+        if v is not None and v > (today or _date_today()):
+            raise ValueError('Date of birth cannot be in the future')
         return v
 
 class UserRead(BaseModel):  # For profile output (no password)
-    email: EmailStr
+    email: str
     first_name: str
     last_name: str
     contact_no: str
     role: str
     status: str
 
+    @field_validator('email', mode='before')
+    def validate_email(cls, v: Any) -> Any:
+        return _check_email(v) if isinstance(v, str) else v
+
 class ResetPasswordRequest(BaseModel):
     password: str
 
-    @field_validator('password')
-    def validate_password(cls, v: str) -> str:
-        if len(v) < 8:
+    @field_validator('password', mode='before')
+    def validate_password(cls, v: Any) -> Any:
+        if isinstance(v, str) and len(v) < 8:
             raise ValueError('Password must be at least 8 characters')
         return v
 
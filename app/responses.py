@@ -0,0 +1,31 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, for handlers that build plain dicts.
+    Installed as the app's default_response_class. Don't pass it as an explicit response_class on
+    routes with a response_model: that would disable FastAPI's Pydantic-core JSON fast path, which
+    the app-level default leaves in place. Such routes can return an instance directly.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_DATACLASS)
+
+
+class PydanticResponse(JSONResponse):
+    """
+    JSON response rendered straight from a Pydantic model's core serializer.
+    For list endpoints whose envelope is built with model_construct from trusted ORM rows:
+    FastAPI passes a returned Response through as-is, so the route's response_model still
+    documents the schema but is not re-validated on every request.
+    """
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content, by_alias=True)
@@ -1,21 +1,20 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import datetime,timedelta
+from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.dependencies.db import db_dependency  
-from app.dependencies.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash
+from app.dependencies.auth import authenticate_user, create_access_token, get_current_user_profile, get_password_hash
 from src.database.database_operations import CRUDOperations
 from src.models.data_model import Users, UserStatus, UserRole 
-from app.model import Token, TokenJson, SignInRequest, UserIn, UserRead
+from app.model import Token, TokenJson, SignInRequest, UserIn, UserRead, USER_ROLES_BY_NAME
+from app.cache import invalidate_responses
 
 auth_router = APIRouter(prefix="/api/auth")  
 
+user_crud = CRUDOperations(Users)
+
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  #Adjust accordingly
 
 @auth_router.post("/token", response_model=Token)
@@ -85,10 +84,9 @@ def sign_up(user_in: UserIn, db: db_dependency):
     # Hash the password
     hashed_password = get_password_hash(user_in.password)
     
-    role_map = {member.value.upper(): member for member in UserRole}  
     if user_in.role:
         try:
-            selected_role = role_map[user_in.role.upper()]
+            selected_role = USER_ROLES_BY_NAME[user_in.role.upper()]
         except KeyError:
             raise HTTPException(status_code=400, detail=f"Invalid role: {user_in.role}. Must be one of: {', '.join([m.value for m in UserRole])}")
     else:
@@ -99,7 +97,7 @@ def sign_up(user_in: UserIn, db: db_dependency):
         "first_name": user_in.first_name,
         "last_name": user_in.last_name,
         "sex": user_in.sex,
-        "dob": datetime.strptime(user_in.dob, "%Y-%m-%d").date() if user_in.dob else None,
+        "dob": user_in.dob,
         "nationality": user_in.nationality,
         "race": user_in.race,
         "contact_no": user_in.contact_no,
@@ -112,13 +110,13 @@ def sign_up(user_in: UserIn, db: db_dependency):
         "status": UserStatus.pending,  
     }
     
-    user_crud = CRUDOperations(Users)
     try:  
         new_user = user_crud.create(db, user_data)
         if not new_user:
             raise HTTPException(status_code=500, detail="Failed to create user")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during creation: {str(e)}")
+    invalidate_responses("users")
     
     return UserRead(
         email=new_user.email,
@@ -130,7 +128,7 @@ def sign_up(user_in: UserIn, db: db_dependency):
     )
 
 @auth_router.get("/users/me", response_model=UserRead)
-def read_users_me(current_user: Users = Depends(get_current_active_user)):
+def read_users_me(current_user: Users = Depends(get_current_user_profile)):
     """
     Get profile of the current authenticated user.
     Requires valid JWT token and active status.
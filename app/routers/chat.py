@@ -1,11 +1,73 @@
+import asyncio
+import time
+from collections import OrderedDict
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Body
-from typing import Optional, Dict
+from typing import Final, Optional, Tuple
 from src.agents.conversation_manager_new import ConversationManager
+from app.cache import invalidate_responses
 
 chat_router = APIRouter(prefix="/chat")
 
+# Live managers by conversation ID, least recently used first. Message history is persisted in Postgres
+# and reloaded by the manager, so an evicted conversation (or one started on another worker) just gets a
+# fresh manager. Each entry carries a lock so concurrent frames for one conversation run one at a time.
+MANAGER_TTL: Final = 1800
+MANAGER_MAXSIZE: Final = 1024
+# Agent calls are blocking (LLM + DB), so they run in worker threads; cap how many are in flight at once
+# and how long a websocket frame may wait for its reply
+AGENT_MAX_CONCURRENCY: Final = 8
+AGENT_TIMEOUT: Final = 60
+agent_slots = asyncio.Semaphore(AGENT_MAX_CONCURRENCY)
+managers: "OrderedDict[int, Tuple[ConversationManager, asyncio.Lock, float]]" = OrderedDict()
 
-managers: Dict[int, ConversationManager] = {}
+def _remember_manager(conversation_id: int, manager: ConversationManager, lock: asyncio.Lock) -> None:
+    """
+    Store (or refresh) a manager as most recently used, dropping expired and overflow entries.
+    Entries whose lock is held are skipped: evicting one mid-turn would let the next frame run beside it.
+    """
+    now = time.monotonic()
+    managers.pop(conversation_id, None)
+    managers[conversation_id] = (manager, lock, now + MANAGER_TTL)
+    excess = len(managers) - MANAGER_MAXSIZE
+    for key, (_, entry_lock, expires) in list(managers.items()):
+        if excess <= 0 and expires > now:
+            break
+        if not entry_lock.locked():
+            del managers[key]
+            excess -= 1
+
+def _get_manager(conversation_id: int) -> Tuple[ConversationManager, asyncio.Lock]:
+    """Manager and lock for an existing conversation, created if missing or expired (and idle)."""
+    entry = managers.get(conversation_id)
+    if entry is None or (entry[2] <= time.monotonic() and not entry[1].locked()):
+        manager, lock = ConversationManager(), asyncio.Lock()
+    else:
+        manager, lock, _ = entry
+    _remember_manager(conversation_id, manager, lock)
+    return manager, lock
+
+async def _process_query(manager: ConversationManager, lock: asyncio.Lock, query: str, conversation_id: Optional[int], timeout: Optional[float] = None) -> dict:
+    """
+    Run the blocking agent call off the event loop under the conversation lock, queueing behind
+    AGENT_MAX_CONCURRENCY in-flight calls. A worker thread can't be interrupted, so the lock and the slot
+    are released when the thread returns, not when a caller gives up waiting on it.
+    """
+    await lock.acquire()
+    try:
+        await agent_slots.acquire()
+    except BaseException:
+        lock.release()
+        raise
+
+    def _release(call: asyncio.Future) -> None:
+        agent_slots.release()
+        lock.release()
+        if not call.cancelled():
+            call.exception()  # Mark an abandoned call's error as retrieved
+
+    call = asyncio.ensure_future(asyncio.to_thread(manager.process_user_query, query, conversation_id))
+    call.add_done_callback(_release)
+    return await asyncio.wait_for(asyncio.shield(call), timeout)
 
 @chat_router.post("/message")
 async def send_message(query: str = Body(...), conversation_id: Optional[int] = Body(None)):
@@ -18,20 +80,20 @@ async def send_message(query: str = Body(...), conversation_id: Optional[int] =
         if conversation_id is None:
             manager = ConversationManager()
             # ID will be created in conversation Manager
-            result = manager.process_user_query(query, None)
+            lock = asyncio.Lock()
+            result = await _process_query(manager, lock, query, None)
             # Get the new ID from the result
             new_id = result["conversation_id"]
-            # Store in the dict
-            managers[new_id] = manager
+            # Keep the manager for follow-up messages
+            _remember_manager(new_id, manager, lock)
+            invalidate_responses("conversations")
             return result
         else:
-            # Existing conversation: Create if not in dict 
-            if conversation_id not in managers:
-                managers[conversation_id] = ConversationManager()
-            # Get the manager
-            manager = managers[conversation_id]
+            # Existing conversation: Create manager if not cached
+            manager, lock = _get_manager(conversation_id)
             # Process
-            result = manager.process_user_query(query, conversation_id)
+            result = await _process_query(manager, lock, query, conversation_id)
+            invalidate_responses("conversations")
             return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -44,15 +106,16 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int):
     """
     await websocket.accept()
     try:
-        # Existing conversation: Create manager if not in dict
-        if conversation_id not in managers:
-            managers[conversation_id] = ConversationManager()
-        # Get the manager
-        manager = managers[conversation_id]
-        
         while True:
             data = await websocket.receive_text()  # User message
-            result = manager.process_user_query(data, conversation_id)
+            # Looked up per frame so a long-lived socket keeps its manager fresh in the cache
+            manager, lock = _get_manager(conversation_id)
+            # Agent + DB work is blocking; run it off the event loop so other sockets keep being served
+            result = await _process_query(manager, lock, data, conversation_id, timeout=AGENT_TIMEOUT)
+            invalidate_responses("conversations")
             await websocket.send_text(result["response"])  # AI response
     except WebSocketDisconnect:
-        pass  
\ No newline at end of file
+        pass  
+    except asyncio.TimeoutError:
+        # Don't leave a hung socket behind a stuck agent call
+        await websocket.close(code=1011, reason="Response timed out")
@@ -1,18 +1,20 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import Annotated
+from fastapi.responses import StreamingResponse
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+from typing import Annotated, AsyncIterator
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.dependencies.db import db_dependency  
-from app.dependencies.auth import get_current_active_user 
+from app.dependencies.db import async_db_dependency, db_dependency
+from app.dependencies.auth import AuthPrincipal, get_current_active_user 
 from app.dependencies.roles import admin_role 
 from src.database.database_operations import CRUDOperations
-from src.models.data_model import Conversations, Messages, Users
-from app.model import ConversationListResponse
+from src.models.data_model import Conversations, Messages
+from app.model import ConversationListResponse, FrontendConversation, FrontendMessage
+from app.responses import PydanticResponse
+from app.cache import cache_body, cache_response, get_cached_response, invalidate_responses
 
 
 conversation_router = APIRouter(
@@ -20,80 +22,152 @@ conversation_router = APIRouter(
     tags=["conversations"],  
 )
 
+conv_crud = CRUDOperations(Conversations)
+
+SUMMARY_LENGTH = 100
+STREAM_BATCH_SIZE = 50
+
+# First SUMMARY_LENGTH characters of each conversation's earliest message, computed in Postgres
+FIRST_MESSAGE_PREVIEW = (
+    select(func.substr(Messages.content, 1, SUMMARY_LENGTH))
+    .where(Messages.conversation_id == Conversations.conversation_id)
+    .order_by(Messages.message_id.asc())
+    .limit(1)
+    .correlate(Conversations)
+    .scalar_subquery()
+)
+CONVERSATION_SUMMARY_STMT = select(
+    Conversations.conversation_id,
+    Conversations.report_id,
+    Conversations.creation_datetime,
+    FIRST_MESSAGE_PREVIEW.label("first_message"),
+).order_by(Conversations.conversation_id.asc())
+
+def _summarize(first_message: str | None) -> str:
+    return first_message[:SUMMARY_LENGTH] + "..." if first_message is not None else "No messages"
+
+def _to_frontend_conversation(conv: Conversations) -> FrontendConversation:
+    # Messages arrive sorted by message_id ASC (relationship order_by)
+    formatted_messages = [
+        FrontendMessage.model_construct(
+            messageId=str(msg.message_id),
+            conversationId=str(conv.conversation_id),
+            senderRole=msg.sender_role.value,
+            content=msg.content,
+            sentDate=msg.sent_datetime
+        ) for msg in conv.messages
+    ]
+    return FrontendConversation.model_construct(
+        conversationId=str(conv.conversation_id),
+        reportId=str(conv.report_id) if conv.report_id else None,
+        creationDate=conv.creation_datetime,
+        messages=formatted_messages,
+        summary=_summarize(formatted_messages[0].content if formatted_messages else None)
+    )
+
+async def _stream_page(cache_key: tuple, first: Conversations | None, rest: AsyncIterator[Conversations], limit: int) -> AsyncIterator[bytes]:
+    """
+    Encode a ConversationListResponse one conversation at a time.
+    Produces the same JSON as the model would; the assembled body is cached once the page completes.
+    """
+    chunks = [b'{"conversations":[']
+    yield chunks[0]
+    count, last_id = 0, None
+    conv = first
+    while conv is not None:
+        model = _to_frontend_conversation(conv)
+        chunk = (b"," if count else b"") + model.__pydantic_serializer__.to_json(model, by_alias=True)
+        chunks.append(chunk)
+        yield chunk
+        count, last_id = count + 1, conv.conversation_id
+        conv = await anext(rest, None)
+    tail = b'],"next_cursor":' + orjson.dumps(last_id if count == limit else None) + b"}"
+    chunks.append(tail)
+    yield tail
+    cache_body(cache_key, b"".join(chunks))
+
+async def _summary_page(db: AsyncSession, limit: int, offset: int, after_id: int | None) -> ConversationListResponse:
+    """Conversation list without message bodies: only the summary preview is fetched from the DB."""
+    stmt = CONVERSATION_SUMMARY_STMT
+    if after_id is not None:
+        stmt = stmt.where(Conversations.conversation_id > after_id)
+    else:
+        stmt = stmt.offset(offset)
+    rows = (await db.execute(stmt.limit(limit))).all()
+    conversations = [
+        FrontendConversation.model_construct(
+            conversationId=str(conversation_id),
+            reportId=str(report_id) if report_id else None,
+            creationDate=creation_datetime,
+            messages=[],
+            summary=_summarize(first_message)
+        ) for conversation_id, report_id, creation_datetime, first_message in rows
+    ]
+    next_cursor = rows[-1].conversation_id if len(rows) == limit else None
+    return ConversationListResponse.model_construct(conversations=conversations, next_cursor=next_cursor)
+
 @conversation_router.get("/", response_model=ConversationListResponse)  
-def get_conversations_endpoint(
-    db: db_dependency,
-    current_user: Users = Depends(admin_role),  
+async def get_conversations_endpoint(
+    db: async_db_dependency,
+    current_user: AuthPrincipal = Depends(admin_role),  
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    after_id: int | None = None,
+    include_messages: bool = True
 ):
     """
-    Retrieve a paginated list of conversations with associated messages.
+    Retrieve a paginated list of conversations with associated messages, streamed one conversation at a time.
+    - Pass the previous page's next_cursor as after_id for keyset paging (offset is ignored when set).
     - Messages are sorted by message_id ASC (insertion order).
     - Dates are formatted as 'dd/MM/yy HH:mm' to match frontend.
     - Sender roles are used directly as "HUMAN" or "AI" (uppercase to match DB enum).
     - Summary is generated from the first message (truncated to 100 chars + "...") or "No messages" if empty.
+    - include_messages=false returns summaries only (messages: []) without loading message bodies.
     Admin-only access.
     """
+    cache_key = ("conversations", limit, offset, after_id, include_messages)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return cached
+    if not include_messages:
+        try:
+            page = await _summary_page(db, limit, offset, after_id)
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
+        return cache_response(cache_key, PydanticResponse(page))
     try:
-        conversations = db.query(Conversations).options(
-            joinedload(Conversations.messages)
-        ).order_by(Conversations.conversation_id.asc()).offset(offset).limit(limit).all()
+        stmt = select(Conversations).options(
+            selectinload(Conversations.messages),
+            raiseload('*')  # Fail loudly if serialization ever touches an unloaded relationship
+        ).order_by(Conversations.conversation_id.asc())
+        if after_id is not None:
+            stmt = stmt.where(Conversations.conversation_id > after_id)
+        else:
+            stmt = stmt.offset(offset)
+        # Rows are fetched in batches while the body streams; pull the first batch here so DB errors still map to a 500
+        result = await db.stream_scalars(stmt.limit(limit).execution_options(yield_per=STREAM_BATCH_SIZE))
+        rows = aiter(result)
+        first = await anext(rows, None)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
-    if not conversations:
-        return ConversationListResponse(conversations=[])
-        
-    enriched_conversations = []
-    for conv in conversations:
-        # Sort messages by message_id ASC 
-        sorted_messages = sorted(conv.messages, key=lambda m: m.message_id)
-            
-        formatted_messages = []
-        for msg in sorted_messages:
-            formatted_role = msg.sender_role.value  
-                
-            formatted_messages.append({
-                "messageId": str(msg.message_id),
-                "conversationId": str(conv.conversation_id),
-                "senderRole": formatted_role,
-                "content": msg.content,
-                "sentDate": msg.sent_datetime.strftime("%d/%m/%y %H:%M")
-            })
-            
-        # Generate summary by truncating first message content or default
-        summary = (
-            formatted_messages[0]["content"][:100] + "..." 
-            if formatted_messages else "No messages"
-        )
-            
-        enriched = {
-            "conversationId": str(conv.conversation_id),
-            "reportId": str(conv.report_id) if conv.report_id else None,
-            "creationDate": conv.creation_datetime.strftime("%d/%m/%y %H:%M"),
-            "messages": formatted_messages,
-            "summary": summary
-        }
-        enriched_conversations.append(enriched)
-        
-    return ConversationListResponse(conversations=enriched_conversations)
+    return StreamingResponse(_stream_page(cache_key, first, rows, limit), media_type="application/json")
 
 @conversation_router.delete("/{conversation_id}", status_code=204)
 def delete_conversation_endpoint(
     conversation_id: int, 
     db: db_dependency,
-    current_user: Users = Depends(admin_role)  # Role-based Access Control (RBAC): Admin-only
+    current_user: AuthPrincipal = Depends(admin_role)  # Role-based Access Control (RBAC): Admin-only
 ):
     """
     Delete a conversation by ID. Associated messages are automatically deleted via database cascade.
     Admin-only access.
     """
-    conv_crud = CRUDOperations(Conversations)
     try:
         deleted = conv_crud.delete(db, conversation_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Conversation with ID {conversation_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during delete: {str(e)}")
+    invalidate_responses("conversations")
     return None
\ No newline at end of file
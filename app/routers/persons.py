@@ -1,78 +1,120 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
-from typing import Annotated, List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from typing import Annotated, Dict, List
+from collections import defaultdict
+from sqlalchemy import bindparam, select
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.dependencies.db import db_dependency
-from app.dependencies.auth import get_current_active_user
+from app.dependencies.db import async_db_dependency
+from app.dependencies.auth import AuthPrincipal, get_current_active_user
 from src.database.database_operations import CRUDOperations
-from src.models.data_model import PersonDetails, Users, ReportPersonsLink
-from app.model import PersonListResponse, PersonResponse, PersonRequest, LinkedReport
+from src.models.data_model import PersonDetails, ReportPersonsLink
+from app.model import PersonListResponse, PersonResponse, PersonRequest, LinkedReport, LinkedReportsBatchRequest, PERSON_ROLE_LABELS
+from app.responses import ORJSONResponse
+from app.cache import cache_response, get_cached_response, invalidate_responses, make_etag, not_modified, table_versions_stmt, with_etag
 
 persons_router = APIRouter(
     prefix="/persons",
     tags=["persons"],
 )
 
-FIELDS_TO_UPPERCASE = [
+person_crud = CRUDOperations(PersonDetails)
+
+# Only the two columns the response needs; served from ix_report_persons_link_person_id_report_id
+LINKED_REPORTS_STMT = (
+    select(ReportPersonsLink.report_id, ReportPersonsLink.role)
+    .where(ReportPersonsLink.person_id == bindparam("person_id"))
+    .order_by(ReportPersonsLink.report_id)
+)
+LINKED_REPORTS_BATCH_STMT = (
+    select(ReportPersonsLink.person_id, ReportPersonsLink.report_id, ReportPersonsLink.role)
+    .where(ReportPersonsLink.person_id.in_(bindparam("person_ids", expanding=True)))
+    .order_by(ReportPersonsLink.person_id, ReportPersonsLink.report_id)
+)
+
+# Write counter for person_details, part of the list cache key
+PERSONS_VERSION_STMT = table_versions_stmt(PersonDetails)
+
+# Columns for the list view, in PersonResponse field order
+PERSON_LIST_COLUMNS = (
+    PersonDetails.first_name, PersonDetails.last_name, PersonDetails.sex, PersonDetails.dob,
+    PersonDetails.nationality, PersonDetails.race, PersonDetails.blk, PersonDetails.street,
+    PersonDetails.unit_no, PersonDetails.postcode, PersonDetails.person_id, PersonDetails.occupation,
+    PersonDetails.contact_no, PersonDetails.email,
+)
+
+def _to_person_response(person: PersonDetails) -> PersonResponse:
+    # Values were just written and read back through the ORM, so they are already the right types
+    return PersonResponse.model_construct(
+        person_id=person.person_id,
+        first_name=person.first_name,
+        last_name=person.last_name,
+        sex=person.sex,
+        dob=person.dob,
+        nationality=person.nationality,
+        race=person.race,
+        occupation=person.occupation,
+        contact_no=person.contact_no,
+        email=person.email,
+        blk=person.blk,
+        street=person.street,
+        unit_no=person.unit_no,
+        postcode=person.postcode
+    )
+
+FIELDS_TO_UPPERCASE = frozenset({
     'first_name', 'last_name', 'nationality', 'race', 'occupation',
     'blk', 'street', 'unit_no', 'postcode'
-]
+})
 
 @persons_router.get("/", response_model=PersonListResponse)
-def get_persons_endpoint(
-    db: db_dependency,
-    current_user: Users = Depends(get_current_active_user),  # Role-Based Account Control (RBAC): Any active authenticated user
+async def get_persons_endpoint(
+    request: Request,
+    db: async_db_dependency,
+    current_user: AuthPrincipal = Depends(get_current_active_user),  # Role-Based Account Control (RBAC): Any active authenticated user
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    after_id: int | None = None
 ):
     """
     Retrieve a list of persons with pagination.
+    Pass the previous page's next_cursor as after_id for keyset paging (offset is ignored when set).
+    Responses carry an ETag; sending it back as If-None-Match returns 304 while the data is unchanged.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    person_crud = CRUDOperations(PersonDetails)
     try:
-        persons = person_crud.read_all(db, limit=limit, offset=offset)
+        version = tuple((await db.execute(PERSONS_VERSION_STMT)).scalars())
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
+    cache_key = ("persons", limit, offset, after_id, version)
+    etag = make_etag(cache_key)
+    unchanged = not_modified(request.headers.get("if-none-match"), etag)
+    if unchanged is not None:
+        return unchanged
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return with_etag(cached, etag)
+    try:
+        persons = await person_crud.read_all_rows_async(db, PERSON_LIST_COLUMNS, limit=limit, offset=offset, after_id=after_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
-    enriched_persons = [
-        PersonResponse(
-            person_id=person.person_id,
-            first_name=person.first_name,
-            last_name=person.last_name,
-            sex=person.sex,
-            dob=person.dob,
-            nationality=person.nationality,
-            race=person.race,
-            occupation=person.occupation,
-            contact_no=person.contact_no,
-            email=person.email,
-            blk=person.blk,
-            street=person.street,
-            unit_no=person.unit_no,
-            postcode=person.postcode
-        ) for person in persons
-    ]
+    # Rows are already in PersonResponse field order with DB-typed values, so each converts straight to a dict
+    enriched_persons = [person._asdict() for person in persons]
     
-    return PersonListResponse(persons=enriched_persons)
+    next_cursor = persons[-1].person_id if len(persons) == limit else None
+    return with_etag(cache_response(cache_key, ORJSONResponse({"persons": enriched_persons, "next_cursor": next_cursor})), etag)
 
 @persons_router.post("/", response_model=PersonResponse)
-def create_person_endpoint(
-    db: db_dependency,
+async def create_person_endpoint(
+    db: async_db_dependency,
     data: PersonRequest = Body(...),
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Create a new person.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    create_data = data.dict(exclude_unset=True)
+    create_data = data.model_dump(exclude_unset=True)
     
     #Ensure required fields are present
     required = ['first_name', 'last_name', 'contact_no', 'email']
@@ -81,117 +123,98 @@ def create_person_endpoint(
         raise HTTPException(status_code=400, detail=f"Missing required fields: {', '.join(missing)}")
     
     #Uppercase specified fields if present
-    for field in FIELDS_TO_UPPERCASE:
-        if field in create_data and isinstance(create_data[field], str):
-            create_data[field] = create_data[field].upper()
-            
-    if 'dob' in create_data and create_data['dob']:
-        try:
-            create_data['dob'] = datetime.strptime(create_data['dob'], "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid format for dob (use YYYY-MM-DD)")
+    for field in create_data.keys() & FIELDS_TO_UPPERCASE:
+        v = create_data[field]
+        if type(v) is str:
+            create_data[field] = v.upper()
     
-    person_crud = CRUDOperations(PersonDetails)
     try:
-        new_person = person_crud.create(db, create_data)
+        new_person = await person_crud.create_async(db, create_data)
         if not new_person:
             raise HTTPException(status_code=500, detail="Failed to create person")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during creation: {str(e)}")
+    invalidate_responses("persons")
     
-    return PersonResponse(
-        person_id=new_person.person_id,
-        first_name=new_person.first_name,
-        last_name=new_person.last_name,
-        sex=new_person.sex,
-        dob=new_person.dob,
-        nationality=new_person.nationality,
-        race=new_person.race,
-        occupation=new_person.occupation,
-        contact_no=new_person.contact_no,
-        email=new_person.email,
-        blk=new_person.blk,
-        street=new_person.street,
-        unit_no=new_person.unit_no,
-        postcode=new_person.postcode
-    )
+    return _to_person_response(new_person)
 
 @persons_router.put("/{person_id}", response_model=PersonResponse)
-def update_person_endpoint(
-    db: db_dependency,
+async def update_person_endpoint(
+    db: async_db_dependency,
     person_id: int,
     data: PersonRequest = Body(...),
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Update a person by its person_id.
     - Provide only the fields to update in the request body.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    update_data = data.dict(exclude_unset=True)
+    update_data = data.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
 
     # Uppercase specified fields if present 
-    for field in FIELDS_TO_UPPERCASE:
-        if field in update_data and isinstance(update_data[field], str):
-            update_data[field] = update_data[field].upper()
-            
-    if 'dob' in update_data and update_data['dob']:
-        try:
-            update_data['dob'] = datetime.strptime(update_data['dob'], "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid format for dob (use YYYY-MM-DD)")
+    for field in update_data.keys() & FIELDS_TO_UPPERCASE:
+        v = update_data[field]
+        if type(v) is str:
+            update_data[field] = v.upper()
     
-    person_crud = CRUDOperations(PersonDetails)
     try:
-        updated_person = person_crud.update(db, person_id, update_data)
+        updated_person = await person_crud.update_returning_async(db, person_id, update_data)
         if not updated_person:
             raise HTTPException(status_code=404, detail=f"Person with ID {person_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during update: {str(e)}")
+    invalidate_responses("persons", "reports")  # Report listings embed linked person names
 
-    return PersonResponse(
-        person_id=updated_person.person_id,
-        first_name=updated_person.first_name,
-        last_name=updated_person.last_name,
-        sex=updated_person.sex,
-        dob=updated_person.dob,
-        nationality=updated_person.nationality,
-        race=updated_person.race,
-        occupation=updated_person.occupation,
-        contact_no=updated_person.contact_no,
-        email=updated_person.email,
-        blk=updated_person.blk,
-        street=updated_person.street,
-        unit_no=updated_person.unit_no,
-        postcode=updated_person.postcode
-    )
+    return _to_person_response(updated_person)
 
 @persons_router.delete("/{person_id}", status_code=204)
-def delete_person_endpoint(
-    db: db_dependency,
+async def delete_person_endpoint(
+    db: async_db_dependency,
     person_id: int,
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Delete a person by its person_id.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    person_crud = CRUDOperations(PersonDetails)
     try:
-        deleted = person_crud.delete(db, person_id)
+        deleted = await person_crud.delete_async(db, person_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Person with ID {person_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during delete: {str(e)}")
+    invalidate_responses("persons", "reports")
     return None
 
+@persons_router.post("/linked_reports:batch", response_model=Dict[int, List[LinkedReport]])
+async def get_linked_reports_batch_endpoint(
+    db: async_db_dependency,
+    data: LinkedReportsBatchRequest = Body(...),
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+):
+    """
+    Retrieve linked reports for several persons in one query.
+    Returns {person_id: [{report_id: str, role: str (lowercase)}]}; persons without links map to [].
+    Accessible by any active authenticated user (Admin, IO, Analyst).
+    """
+    try:
+        rows = (await db.execute(LINKED_REPORTS_BATCH_STMT, {"person_ids": data.ids})).all()
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
+    
+    linked: Dict[int, List[LinkedReport]] = defaultdict(list)
+    for person_id, report_id, role in rows:
+        linked[person_id].append(LinkedReport.model_construct(report_id=str(report_id), role=PERSON_ROLE_LABELS[role]))
+    return {person_id: linked.get(person_id, []) for person_id in data.ids}
+
 @persons_router.get("/{person_id}/linked_reports", response_model=List[LinkedReport])
-def get_linked_reports_endpoint(
+async def get_linked_reports_endpoint(
     person_id: int,
-    db: db_dependency,
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    db: async_db_dependency,
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Retrieve linked reports for a person by person_id.
@@ -199,18 +222,11 @@ def get_linked_reports_endpoint(
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
     try:
-        links = db.query(ReportPersonsLink).filter(ReportPersonsLink.person_id == person_id).all()
+        rows = (await db.execute(LINKED_REPORTS_STMT, {"person_id": person_id})).all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
-        
-
-    if not links:
-        return []  
     
-    enriched_links = [
-        LinkedReport(
-            report_id=str(link.report_id),
-            role=link.role.value.lower()
-        ) for link in links
-    ]
-    return enriched_links
\ No newline at end of file
+    return [
+        LinkedReport.model_construct(report_id=str(report_id), role=PERSON_ROLE_LABELS[role])
+        for report_id, role in rows
+    ]
\ No newline at end of file
@@ -1,15 +1,13 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
+import asyncio
 from fastapi import APIRouter, HTTPException, Body, Depends
-from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime, date
+from datetime import date
 
-from app.dependencies.db import db_dependency
+from app.dependencies.db import async_db_dependency
+from app.dependencies.vector_store import get_vector_store
 from app.model import PublicReportResponse, PublicReportSubmission
-from src.database.database_operations import CRUDOperations, db_manager
+from app.cache import invalidate_responses
+from src.database.database_operations import CRUDOperations
 from src.database.vector_operations import VectorStore
 from src.models.data_model import ScamReports, PersonDetails, ReportPersonsLink, ReportStatus, PersonRole, Conversations
 
@@ -18,21 +16,26 @@ public_reports_router = APIRouter(
     tags=["public_reports"],
 )
 
-PERSON_FIELDS_TO_UPPERCASE = [
+person_crud = CRUDOperations(PersonDetails)
+report_crud = CRUDOperations(ScamReports)
+link_crud = CRUDOperations(ReportPersonsLink)
+
+# Submission keys that belong to each table
+PERSON_COLUMN_KEYS = frozenset(PersonDetails.__table__.columns.keys())
+REPORT_COLUMN_KEYS = frozenset(ScamReports.__table__.columns.keys())
+
+PERSON_FIELDS_TO_UPPERCASE = frozenset({
     'first_name', 'last_name', 'nationality', 'race', 'occupation',
     'blk', 'street', 'unit_no', 'postcode'
-]
-REPORT_FIELDS_TO_UPPERCASE = [
+})
+REPORT_FIELDS_TO_UPPERCASE = frozenset({
     'scam_type', 'scam_approach_platform', 'scam_communication_platform',
     'scam_transaction_type', 'scam_beneficiary_platform', 'scam_beneficiary_identifier'
-]
-
-def get_vector_store():
-    return VectorStore(db_manager.session_factory)
+})
 
 @public_reports_router.post("/submit", response_model=PublicReportResponse)
-def submit_public_report(
-    db: db_dependency,
+async def submit_public_report(
+    db: async_db_dependency,
     data: PublicReportSubmission = Body(...),
     vector_store: VectorStore = Depends(get_vector_store)
 ):
@@ -41,7 +44,7 @@ def submit_public_report(
     Creates person, report, and link. No auth required.
     Accessible by public users.
     """
-    create_data = data.dict(exclude_unset=True)
+    create_data = data.model_dump(exclude_unset=True)
     
     #Required fields check
     person_required = ['first_name', 'last_name', 'contact_no', 'email']
@@ -51,55 +54,41 @@ def submit_public_report(
         raise HTTPException(status_code=400, detail=f"Missing required fields: {', '.join(missing)}")
     
     # Prepare person data with uppercasing
-    person_data = {k: create_data.get(k) for k in PersonDetails.__table__.columns.keys() if k in create_data}
-    for field in PERSON_FIELDS_TO_UPPERCASE:
-        if field in person_data and isinstance(person_data[field], str):
-            person_data[field] = person_data[field].upper()
-    if 'dob' in person_data and person_data['dob']:
-        try:
-            person_data['dob'] = datetime.strptime(person_data['dob'], "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid format for dob (use YYYY-MM-DD)")
+    person_data = {k: v for k, v in create_data.items() if k in PERSON_COLUMN_KEYS}
+    for field in person_data.keys() & PERSON_FIELDS_TO_UPPERCASE:
+        v = person_data[field]
+        if type(v) is str:
+            person_data[field] = v.upper()
     if person_data.get("dob") and person_data["dob"] > date.today():
         raise HTTPException(status_code=400, detail="Date of birth cannot be in the future")
 
-    # Prepare report data with uppercasing and embedding
-    report_data = {k: create_data.get(k) for k in ScamReports.__table__.columns.keys() if k in create_data}
-    for field in REPORT_FIELDS_TO_UPPERCASE:
-        if field in report_data and isinstance(report_data[field], str):
-            report_data[field] = report_data[field].upper()
-    report_data["scam_incident_date"] = datetime.strptime(create_data["scam_incident_date"], "%Y-%m-%d").date()
-    report_data["scam_report_date"] = datetime.strptime(create_data["scam_report_date"], "%Y-%m-%d").date() if create_data.get("scam_report_date") else date.today()
+    # Prepare report data with uppercasing
+    report_data = {k: v for k, v in create_data.items() if k in REPORT_COLUMN_KEYS}
+    for field in report_data.keys() & REPORT_FIELDS_TO_UPPERCASE:
+        v = report_data[field]
+        if type(v) is str:
+            report_data[field] = v.upper()
+    report_data["scam_report_date"] = create_data.get("scam_report_date") or date.today()
     report_data["status"] = ReportStatus.unassigned
     report_data["io_in_charge"] = None
     
     if report_data["scam_incident_date"] > report_data["scam_report_date"] or report_data["scam_report_date"] > date.today():
         raise HTTPException(status_code=400, detail="Invalid dates: incident_date <= report_date <= today")
     
-    # Embedding 
-    embedding = vector_store.get_embedding(report_data["scam_incident_description"])
-    report_data["embedding"] = embedding
-
     role_str = data.role.lower().strip() if data.role else 'reportee'  # Added .strip() for safety (removes extra spaces)
     try:
         link_role = PersonRole[role_str]  # Use lowercase role_str directly
     except KeyError:
         raise HTTPException(status_code=400, detail=f"Invalid role: '{role_str}'. Must be one of: victim, suspect, witness, reportee")
     
-    #Create records
-    person_crud = CRUDOperations(PersonDetails)
-    report_crud = CRUDOperations(ScamReports)
-    link_crud = CRUDOperations(ReportPersonsLink)
-    conv_crud = CRUDOperations(Conversations)
-
+    # Embedding is CPU-bound model inference, run in a worker thread before the transaction opens: the inserts
+    # fire the table_versions trigger, whose counter-row lock is held until commit
+    report_data["embedding"] = await asyncio.to_thread(vector_store.get_embedding, report_data["scam_incident_description"])
+    
+    # Create records in one transaction: each insert is flushed for its ID and the whole submission commits once
     try:
-        new_person = person_crud.create(db, person_data)
-        if not new_person:
-            raise HTTPException(status_code=500, detail="Failed to create person record")
-
-        new_report = report_crud.create(db, report_data)
-        if not new_report:
-            raise HTTPException(status_code=500, detail="Failed to create report record")
+        new_person = await person_crud.create_no_commit_async(db, person_data)
+        new_report = await report_crud.create_no_commit_async(db, report_data)
 
         # Link with specified role 
         link_data = {
@@ -107,27 +96,25 @@ def submit_public_report(
             "person_id": new_person.person_id,
             "role": link_role,
         }
-        new_link = link_crud.create(db, link_data)
-        if not new_link:
-            raise HTTPException(status_code=500, detail="Failed to link person to report")
+        await link_crud.create_no_commit_async(db, link_data)
 
         # If conversation_id provided, link it to the new report
         linked_conv_id = None
         if data.conversation_id:
-            conversation = db.query(Conversations).filter(Conversations.conversation_id == data.conversation_id).first()
+            conversation = await db.get(Conversations, data.conversation_id)
             if not conversation:
+                await db.rollback()
                 raise HTTPException(status_code=404, detail=f"Conversation with ID {data.conversation_id} not found")
             # Update conversation's report_id
-            conv_update = {"report_id": new_report.report_id}
-            updated_conv = conv_crud.update(db, data.conversation_id, conv_update)
-            if not updated_conv:
-                raise HTTPException(status_code=500, detail="Failed to link conversation to report")
-            linked_conv_id = updated_conv.conversation_id
+            conversation.report_id = new_report.report_id
+            linked_conv_id = conversation.conversation_id
 
+        await db.commit()
+        invalidate_responses("reports", "persons", "conversations")
         return PublicReportResponse(report_id=new_report.report_id, conversation_id=linked_conv_id)
     
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
\ No newline at end of file
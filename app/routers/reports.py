@@ -1,107 +1,128 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Annotated, List
-from datetime import datetime, date
+from collections import defaultdict
+from datetime import date
 
-from app.dependencies.db import db_dependency
-from app.dependencies.auth import get_current_active_user
-from src.database.database_operations import CRUDOperations, db_manager
+from app.dependencies.db import async_db_dependency, db_dependency
+from app.dependencies.auth import AuthPrincipal, get_current_active_user
+from app.dependencies.vector_store import get_vector_store
+from src.database.database_operations import CRUDOperations
 from src.database.vector_operations import VectorStore
 from src.models.data_model import ScamReports, Users, ReportPersonsLink, PersonDetails, ReportStatus, PersonRole
-from app.model import ScamReportListResponse, ScamReportResponse, ReportRequest, LinkedPerson, LinkedPersonCreate
+from app.model import ScamReportListResponse, ScamReportResponse, ReportRequest, LinkedPerson, LinkedPersonCreate, PERSON_ROLE_LABELS
+from app.responses import PydanticResponse
+from app.cache import cache_response, get_cached_response, invalidate_responses, make_etag, not_modified, table_versions_stmt, with_etag
 
 reports_router = APIRouter(
     prefix="/reports",
     tags=["reports"],
 )
 
-FIELDS_TO_UPPERCASE = [
-    'scam_type', 'scam_approach_platform', 'scam_communication_platform',
-    'scam_transaction_type', 'scam_beneficiary_platform', 'scam_beneficiary_identifier', 'status'
-]
+scam_crud = CRUDOperations(ScamReports)
 
-def get_vector_store():
-    """Dependency to provide VectorStore instance."""
-    return VectorStore(db_manager.session_factory)
+# Report responses as Core rows (list, create and update): the response columns (no embedding)
+# plus the assigned IO's ID and SQL-built name
+REPORT_LIST_STMT = (
+    select(
+        ScamReports.report_id, ScamReports.scam_incident_date, ScamReports.scam_report_date,
+        ScamReports.scam_type, ScamReports.scam_approach_platform, ScamReports.scam_communication_platform,
+        ScamReports.scam_transaction_type, ScamReports.scam_beneficiary_platform, ScamReports.scam_beneficiary_identifier,
+        ScamReports.scam_contact_no, ScamReports.scam_email, ScamReports.scam_moniker, ScamReports.scam_url_link,
+        ScamReports.scam_amount_lost, ScamReports.scam_incident_description, ScamReports.status,
+        Users.user_id.label("io_id"), Users.full_name.label("io_name"),
+    )
+    .outerjoin(Users, ScamReports.io_in_charge == Users.user_id)
+    .order_by(ScamReports.report_id.asc())
+)
 
-def enrich_report(db: Session, report: ScamReports) -> ScamReportResponse:
-    """Helper to enrich a single report with IO name, linked persons, and status title."""
-    
-    io_id = report.io.user_id if report.io else None
-    io_name = f"{report.io.first_name} {report.io.last_name}" if report.io else ""
-    linked_persons = [
-        LinkedPerson(
-            id=str(poi.person.person_id),
-            name=f"{poi.person.first_name} {poi.person.last_name}",
-            role=poi.role.value.lower()
-        ) for poi in report.pois
+# Linked persons for a whole page of reports in one query, grouped by report_id in Python
+LINKED_PERSONS_BATCH_STMT = (
+    select(ReportPersonsLink.report_id, PersonDetails.person_id, PersonDetails.full_name, ReportPersonsLink.role)
+    .join(PersonDetails, ReportPersonsLink.person_id == PersonDetails.person_id)
+    .where(ReportPersonsLink.report_id.in_(bindparam("report_ids", expanding=True)))
+    .order_by(ReportPersonsLink.report_id, ReportPersonsLink.person_id)
+)
+
+# Write counters for everything a reports page shows: reports, links, and linked person / IO names
+REPORTS_VERSION_STMT = table_versions_stmt(ScamReports, ReportPersonsLink, PersonDetails, Users)
+
+def serialize_reports(reports: list, person_rows: list) -> list[ScamReportResponse]:
+    """Build responses from REPORT_LIST_STMT rows and their LINKED_PERSONS_BATCH_STMT rows."""
+    linked_persons = defaultdict(list)
+    for report_id, person_id, full_name, role in person_rows:
+        linked_persons[report_id].append((person_id, full_name, role))
+    return [
+        ScamReportResponse.from_joined_rows(report, report.io_id, report.io_name, linked_persons[report.report_id])
+        for report in reports
     ]
-    status_title = report.status.value.capitalize()  
-    
-    return ScamReportResponse(
-        report_id=report.report_id,
-        scam_incident_date=report.scam_incident_date,
-        scam_report_date=report.scam_report_date,
-        scam_type=report.scam_type,
-        scam_approach_platform=report.scam_approach_platform,
-        scam_communication_platform=report.scam_communication_platform,
-        scam_transaction_type=report.scam_transaction_type,
-        scam_beneficiary_platform=report.scam_beneficiary_platform,
-        scam_beneficiary_identifier=report.scam_beneficiary_identifier,
-        scam_contact_no=report.scam_contact_no,
-        scam_email=report.scam_email,
-        scam_moniker=report.scam_moniker,
-        scam_url_link=report.scam_url_link,
-        scam_amount_lost=report.scam_amount_lost,
-        scam_incident_description=report.scam_incident_description,
-        status=status_title,
-        assigned_IO_id=io_id,
-        assigned_IO=io_name,
-        linked_persons=linked_persons
-    )
+
+def load_report_response(db: Session, report_id: int) -> ScamReportResponse | None:
+    """Re-read one report with the list endpoint's Core statements and build its response."""
+    report = db.execute(REPORT_LIST_STMT.where(ScamReports.report_id == report_id)).first()
+    if report is None:
+        return None
+    person_rows = db.execute(LINKED_PERSONS_BATCH_STMT, {"report_ids": [report_id]}).all()
+    return serialize_reports([report], person_rows)[0]
 
 @reports_router.get("/", response_model=ScamReportListResponse)
-def get_reports_endpoint(
-    db: db_dependency,
-    current_user: Users = Depends(get_current_active_user),  # RBAC: Any active authenticated user
+async def get_reports_endpoint(
+    request: Request,
+    db: async_db_dependency,
+    current_user: AuthPrincipal = Depends(get_current_active_user),  # RBAC: Any active authenticated user
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    after_id: int | None = None
 ):
     """
     Retrieve a list of scam reports with pagination, including joined data for IO and linked persons.
+    Pass the previous page's next_cursor as after_id for keyset paging (offset is ignored when set).
+    Responses carry an ETag; sending it back as If-None-Match returns 304 while the data is unchanged.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
     try:
-        reports = db.query(ScamReports).options(
-            joinedload(ScamReports.io),
-            joinedload(ScamReports.pois).joinedload(ReportPersonsLink.person)
-        ).order_by(ScamReports.report_id.asc()).offset(offset).limit(limit).all()
+        version = tuple((await db.execute(REPORTS_VERSION_STMT)).scalars())
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
+    cache_key = ("reports", limit, offset, after_id, version)
+    etag = make_etag(cache_key)
+    unchanged = not_modified(request.headers.get("if-none-match"), etag)
+    if unchanged is not None:
+        return unchanged
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return with_etag(cached, etag)
+    try:
+        stmt = REPORT_LIST_STMT
+        if after_id is not None:
+            stmt = stmt.where(ScamReports.report_id > after_id)
+        else:
+            stmt = stmt.offset(offset)
+        reports = (await db.execute(stmt.limit(limit))).all()
+        person_rows = []
+        if reports:
+            person_rows = (await db.execute(LINKED_PERSONS_BATCH_STMT, {"report_ids": [r.report_id for r in reports]})).all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
-    if not reports:
-        return ScamReportListResponse(reports=[])
-    
-    enriched_reports = [enrich_report(db, report) for report in reports]
-    return ScamReportListResponse(reports=enriched_reports)
+    enriched_reports = serialize_reports(reports, person_rows)
+    next_cursor = reports[-1].report_id if len(reports) == limit else None
+    return with_etag(cache_response(cache_key, PydanticResponse(ScamReportListResponse.model_construct(reports=enriched_reports, next_cursor=next_cursor))), etag)
 
 @reports_router.post("/", response_model=ScamReportResponse)
 def create_report_endpoint(
     db: db_dependency,
     data: ReportRequest = Body(...),
     vector_store: VectorStore = Depends(get_vector_store),
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Create a new scam report.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    create_data = data.dict(exclude_unset=True)
+    create_data = data.model_dump(exclude_unset=True)
     
     # Ensure required fields and non-empty description
     required = ['scam_incident_date', 'scam_report_date', 'scam_incident_description']
@@ -111,22 +132,9 @@ def create_report_endpoint(
     if not create_data['scam_incident_description'].strip():
         raise HTTPException(status_code=400, detail="scam_incident_description cannot be empty")
     
-    # Uppercase specified fields
-    for field in FIELDS_TO_UPPERCASE:
-        if field in create_data and isinstance(create_data[field], str):
-            create_data[field] = create_data[field].upper()
-    
-    # Validate and convert dates
-    today = date.today()
-    try:
-        incident_date = datetime.strptime(create_data['scam_incident_date'], "%Y-%m-%d").date()
-        report_date = datetime.strptime(create_data['scam_report_date'], "%Y-%m-%d").date()
-        if incident_date > report_date or report_date > today:
-            raise ValueError("Invalid dates: incident_date <= report_date <= today")
-        create_data['scam_incident_date'] = incident_date
-        create_data['scam_report_date'] = report_date
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=f"Invalid date format or logic: {str(ve)} (use YYYY-MM-DD)")
+    # Validate date ordering (format is already checked by ReportRequest)
+    if create_data['scam_incident_date'] > create_data['scam_report_date'] or create_data['scam_report_date'] > date.today():
+        raise HTTPException(status_code=400, detail="Invalid date logic: Invalid dates: incident_date <= report_date <= today")
     
     # Validate amount if provided
     if 'scam_amount_lost' in create_data and create_data['scam_amount_lost'] < 0:
@@ -162,11 +170,11 @@ def create_report_endpoint(
         if new_status == 'UNASSIGNED' and new_io is not None:
             raise HTTPException(status_code=400, detail="Cannot set status to UNASSIGNED with io_in_charge provided")
         
-    scam_crud = CRUDOperations(ScamReports)
     try:
         new_report = scam_crud.create(db, create_data)
         if not new_report:
             raise HTTPException(status_code=500, detail="Failed to create report")
+        invalidate_responses("reports")
         
         # Generate embedding
         embedding = vector_store.get_embedding(new_report.scam_incident_description)
@@ -174,12 +182,7 @@ def create_report_endpoint(
         if not updated:
             raise HTTPException(status_code=500, detail="Failed to update embedding")
         
-        new_report = db.query(ScamReports).options(
-            joinedload(ScamReports.io),
-            joinedload(ScamReports.pois).joinedload(ReportPersonsLink.person)
-        ).filter(ScamReports.report_id == new_report.report_id).first()
-        
-        return enrich_report(db, new_report)
+        return load_report_response(db, new_report.report_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during creation: {str(e)}")
 
@@ -189,14 +192,14 @@ def update_report_endpoint(
     report_id: int,
     data: ReportRequest = Body(...),
     vector_store: VectorStore = Depends(get_vector_store),
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Update a scam report by report_id.
     - Provide only fields to update. If updating description, it cannot be empty.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    update_data = data.dict(exclude_unset=True)
+    update_data = data.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
     
@@ -204,29 +207,18 @@ def update_report_endpoint(
     if 'scam_incident_description' in update_data and not update_data['scam_incident_description'].strip():
         raise HTTPException(status_code=400, detail="scam_incident_description cannot be empty")
     
-    # Uppercase specified fields
-    for field in FIELDS_TO_UPPERCASE:
-        if field in update_data and isinstance(update_data[field], str):
-            update_data[field] = update_data[field].upper()
-    
-    # Validate and convert dates if provided
-    today = date.today()
+    # Validate date ordering if provided (format is already checked by ReportRequest)
     if 'scam_incident_date' in update_data or 'scam_report_date' in update_data:
-        try:
-            current_report = db.query(ScamReports).filter(ScamReports.report_id == report_id).first()
-            if not current_report:
-                raise HTTPException(status_code=404, detail=f"Report with ID {report_id} not found")
-            
-            incident_str = update_data.get('scam_incident_date', current_report.scam_incident_date.strftime("%Y-%m-%d"))
-            report_str = update_data.get('scam_report_date', current_report.scam_report_date.strftime("%Y-%m-%d"))
-            incident_date = datetime.strptime(incident_str, "%Y-%m-%d").date()
-            report_date = datetime.strptime(report_str, "%Y-%m-%d").date()
-            if incident_date > report_date or report_date > today:
-                raise ValueError("Invalid dates: incident_date <= report_date <= today")
-            update_data['scam_incident_date'] = incident_date
-            update_data['scam_report_date'] = report_date
-        except ValueError as ve:
-            raise HTTPException(status_code=400, detail=f"Invalid date format or logic: {str(ve)} (use YYYY-MM-DD)")
+        current_report = db.query(ScamReports).filter(ScamReports.report_id == report_id).first()
+        if not current_report:
+            raise HTTPException(status_code=404, detail=f"Report with ID {report_id} not found")
+        
+        incident_date = update_data.get('scam_incident_date') or current_report.scam_incident_date
+        report_date = update_data.get('scam_report_date') or current_report.scam_report_date
+        if incident_date > report_date or report_date > date.today():
+            raise HTTPException(status_code=400, detail="Invalid date logic: Invalid dates: incident_date <= report_date <= today")
+        update_data['scam_incident_date'] = incident_date
+        update_data['scam_report_date'] = report_date
     
     # Validate amount if provided
     if 'scam_amount_lost' in update_data and update_data['scam_amount_lost'] < 0:
@@ -266,11 +258,11 @@ def update_report_endpoint(
         if new_status == 'UNASSIGNED' and new_io is not None:
             raise HTTPException(status_code=400, detail="Cannot set status to UNASSIGNED with io_in_charge provided")
         
-    scam_crud = CRUDOperations(ScamReports)
     try:
-        updated_report = scam_crud.update(db, report_id, update_data)
+        updated_report = scam_crud.update_returning(db, report_id, update_data)
         if not updated_report:
             raise HTTPException(status_code=404, detail=f"Report with ID {report_id} not found")
+        invalidate_responses("reports")
         
         # Generate embedding if description updated
         if 'scam_incident_description' in update_data:
@@ -280,12 +272,7 @@ def update_report_endpoint(
             if not updated_emb:
                 raise HTTPException(status_code=500, detail="Failed to update embedding")
         
-        updated_report = db.query(ScamReports).options(
-            joinedload(ScamReports.io),
-            joinedload(ScamReports.pois).joinedload(ReportPersonsLink.person)
-        ).filter(ScamReports.report_id == report_id).first()
-        
-        return enrich_report(db, updated_report)
+        return load_report_response(db, report_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during update: {str(e)}")
 
@@ -293,46 +280,43 @@ def update_report_endpoint(
 def delete_report_endpoint(
     db: db_dependency,
     report_id: int,
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Delete a scam report by report_id.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
-    scam_crud = CRUDOperations(ScamReports)
     try:
         deleted = scam_crud.delete(db, report_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Report with ID {report_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during delete: {str(e)}")
+    invalidate_responses("reports", "conversations")
     return None
 
 @reports_router.get("/{report_id}/linked_persons", response_model=List[LinkedPerson])
 def get_linked_persons_endpoint(
     report_id: int,
     db: db_dependency,
-    current_user: Users = Depends(get_current_active_user)  # RBAC: Any active authenticated user
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # RBAC: Any active authenticated user
 ):
     """
     Retrieve linked persons for a report by report_id.
     Accessible by any active authenticated user (Admin, IO, Analyst).
     """
     try:
-        links = db.query(ReportPersonsLink).options(
-            joinedload(ReportPersonsLink.person)
-        ).filter(ReportPersonsLink.report_id == report_id).all()
+        person_rows = db.execute(LINKED_PERSONS_BATCH_STMT, {"report_ids": [report_id]}).all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
-    enriched_links = [
-        LinkedPerson(
-            id=str(link.person.person_id),
-            name=f"{link.person.first_name} {link.person.last_name}",
-            role=link.role.value.lower()
-        ) for link in links
+    return [
+        LinkedPerson.model_construct(
+            id=str(person_id),
+            name=full_name,
+            role=PERSON_ROLE_LABELS[role]
+        ) for _, person_id, full_name, role in person_rows
     ]
-    return enriched_links
 
 
 @reports_router.post("/{report_id}/linked_persons", response_model=LinkedPerson)
@@ -340,7 +324,7 @@ def add_linked_person_endpoint(
     report_id: int,
     data: LinkedPersonCreate,
     db: db_dependency,
-    current_user: Users = Depends(get_current_active_user)
+    current_user: AuthPrincipal = Depends(get_current_active_user)
 ):
     """
     Add a linked person to a report.
@@ -360,7 +344,7 @@ def add_linked_person_endpoint(
     try:
         role_enum = PersonRole[data.role.lower()]
     except KeyError:
-        raise HTTPException(status_code=400, detail=f"Invalid role: Must be one of {', '.join([r.value.lower() for r in PersonRole])}")
+        raise HTTPException(status_code=400, detail=f"Invalid role: Must be one of {', '.join(PERSON_ROLE_LABELS.values())}")
     
     # Check if link already exists
     existing = db.query(ReportPersonsLink).filter(
@@ -383,12 +367,13 @@ def add_linked_person_endpoint(
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error during creation: {str(e)}")
+    invalidate_responses("reports")
     
     # Return enriched
     return LinkedPerson(
         id=str(new_link.person.person_id),
-        name=f"{new_link.person.first_name} {new_link.person.last_name}",
-        role=new_link.role.value.lower()
+        name=new_link.person.full_name,
+        role=PERSON_ROLE_LABELS[new_link.role]
     )
 
 @reports_router.delete("/{report_id}/linked_persons/{person_id}", status_code=204)
@@ -396,7 +381,7 @@ def delete_linked_person_endpoint(
     report_id: int,
     person_id: int,
     db: db_dependency,
-    current_user: Users = Depends(get_current_active_user)
+    current_user: AuthPrincipal = Depends(get_current_active_user)
 ):
     """
     Delete a linked person from a report by person_id.
@@ -414,4 +399,5 @@ def delete_linked_person_endpoint(
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error during delete: {str(e)}")
+    invalidate_responses("reports")
     return None
\ No newline at end of file
@@ -1,76 +1,106 @@
-import os
-import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from sqlalchemy.orm import Session
 from typing import Annotated, List
-from datetime import datetime
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.dependencies.db import db_dependency
+from app.dependencies.db import async_db_dependency, db_dependency
 from app.dependencies.roles import admin_role  
 from src.database.database_operations import CRUDOperations
 from src.models.data_model import Users, UserRole, UserStatus
-from app.dependencies.auth import get_password_hash, get_current_active_user 
-from app.model import UserListResponse, UserResponse, UserRequest, ResetPasswordRequest, IOOption, IOListResponse
+from app.dependencies.auth import AuthPrincipal, clear_token_cache, get_password_hash, get_current_active_user 
+from app.model import UserListResponse, UserResponse, UserRequest, ResetPasswordRequest, IOOption, IOListResponse, USER_ROLES_BY_NAME, USER_STATUSES_BY_NAME
+from app.responses import PydanticResponse
+from app.cache import cache_response, get_cached_response, invalidate_responses, make_etag, not_modified, table_versions_stmt, with_etag
 
 users_router = APIRouter(
     prefix="/users",
     tags=["users"],
 )
 
-FIELDS_TO_UPPERCASE = [
-    'first_name', 'last_name', 'sex','nationality', 'race',
-    'blk', 'street', 'unit_no', 'postcode'
-]
+user_crud = CRUDOperations(Users)
+
+# Columns for the list view (never the password hash)
+USER_LIST_COLUMNS = (
+    Users.user_id, Users.first_name, Users.last_name, Users.sex, Users.dob, Users.nationality,
+    Users.race, Users.contact_no, Users.email, Users.blk, Users.street, Users.unit_no,
+    Users.postcode, Users.role, Users.status, Users.registration_datetime, Users.last_updated_datetime,
+)
+
+# Write counter for users, part of the list cache key
+USERS_VERSION_STMT = table_versions_stmt(Users)
+
+# Dropdown options only need the ID and the SQL-built display name
+ACTIVE_IOS_STMT = (
+    select(Users.user_id, Users.full_name)
+    .where(Users.role == UserRole.io, Users.status == UserStatus.active)
+    .order_by(Users.user_id.asc())
+)
+
+def to_user_response(user: Users) -> UserResponse:
+    """Build a UserResponse from a trusted Users entity or USER_LIST_COLUMNS row without re-running field validation."""
+    return UserResponse.model_construct(
+        user_id=user.user_id,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        sex=user.sex,
+        dob=user.dob,
+        nationality=user.nationality,
+        race=user.race,
+        contact_no=user.contact_no,
+        email=user.email,
+        blk=user.blk,
+        street=user.street,
+        unit_no=user.unit_no,
+        postcode=user.postcode,
+        role=user.role.value,
+        status=user.status.value,
+        registration_datetime=user.registration_datetime,
+        last_updated_datetime=user.last_updated_datetime
+    )
 
 @users_router.get("/", response_model=UserListResponse)
-def get_users_endpoint(
-    db: db_dependency,
-    current_user: Users = Depends(admin_role),  # Restricted to Admins
+async def get_users_endpoint(
+    request: Request,
+    db: async_db_dependency,
+    current_user: AuthPrincipal = Depends(admin_role),  # Restricted to Admins
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    after_id: int | None = None
 ):
     """
     Retrieve a list of users with pagination.
+    Pass the previous page's next_cursor as after_id for keyset paging (offset is ignored when set).
+    Responses carry an ETag; sending it back as If-None-Match returns 304 while the data is unchanged.
     Accessible only by Admins.
     """
-    user_crud = CRUDOperations(Users)
     try:
-        users = user_crud.read_all(db, limit=limit, offset=offset)
+        version = tuple((await db.execute(USERS_VERSION_STMT)).scalars())
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
+    cache_key = ("users", limit, offset, after_id, version)
+    etag = make_etag(cache_key)
+    unchanged = not_modified(request.headers.get("if-none-match"), etag)
+    if unchanged is not None:
+        return unchanged
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return with_etag(cached, etag)
+    try:
+        users = await user_crud.read_all_rows_async(db, USER_LIST_COLUMNS, limit=limit, offset=offset, after_id=after_id)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
-    enriched_users = [
-        UserResponse(
-            user_id=user.user_id,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            sex=user.sex,
-            dob=user.dob,
-            nationality=user.nationality,
-            race=user.race,
-            contact_no=user.contact_no,
-            email=user.email,
-            blk=user.blk,
-            street=user.street,
-            unit_no=user.unit_no,
-            postcode=user.postcode,
-            role=user.role.value,
-            status=user.status.value,
-            registration_datetime=user.registration_datetime,
-            last_updated_datetime=user.last_updated_datetime
-        ) for user in users
-    ]
+    enriched_users = [to_user_response(user) for user in users]
     
-    return UserListResponse(users=enriched_users)
+    next_cursor = users[-1].user_id if len(users) == limit else None
+    return with_etag(cache_response(cache_key, PydanticResponse(UserListResponse.model_construct(users=enriched_users, next_cursor=next_cursor))), etag)
 
 @users_router.post("/", response_model=UserResponse)
 def create_user_endpoint(
     db: db_dependency,
     data: UserRequest = Body(...),
-    current_user: Users = Depends(admin_role)  # Restricted to Admins
+    current_user: AuthPrincipal = Depends(admin_role)  # Restricted to Admins
 ):
     """
     Create a new user.
@@ -79,7 +109,7 @@ def create_user_endpoint(
     - Defaults to PENDING status if not provided.
     Accessible only by Admins.
     """
-    create_data = data.dict(exclude_unset=True)
+    create_data = data.model_dump(exclude_unset=True)
     
     # Ensure required fields are present
     required = ['password', 'first_name', 'last_name', 'contact_no', 'email', 'role']
@@ -87,29 +117,15 @@ def create_user_endpoint(
     if missing:
         raise HTTPException(status_code=400, detail=f"Missing required fields: {', '.join(missing)}")
     
-    # Uppercase specified fields if present
-    for field in FIELDS_TO_UPPERCASE:
-        if field in create_data and isinstance(create_data[field], str):
-            create_data[field] = create_data[field].upper()
-    
-    # Parse DOB if provided
-    if 'dob' in create_data and create_data['dob']:
-        try:
-            create_data['dob'] = datetime.strptime(create_data['dob'], "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid format for dob (use YYYY-MM-DD)")
-    
-    role_map = {member.value.upper(): member for member in UserRole}
     try:
-        create_data['role'] = role_map[create_data['role'].upper()]
+        create_data['role'] = USER_ROLES_BY_NAME[create_data['role']]
     except KeyError:
         raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join([m.value for m in UserRole])}")
     
     # Handle status: Map string to enum, default to PENDING
     if 'status' in create_data:
-        status_map = {member.value.upper(): member for member in UserStatus}
         try:
-            create_data['status'] = status_map[create_data['status'].upper()]
+            create_data['status'] = USER_STATUSES_BY_NAME[create_data['status']]
         except KeyError:
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join([m.value for m in UserStatus])}")
     else:
@@ -118,40 +134,22 @@ def create_user_endpoint(
     # Hash the password
     create_data['password'] = get_password_hash(create_data['password'])
     
-    user_crud = CRUDOperations(Users)
     try:
         new_user = user_crud.create(db, create_data)
         if not new_user:
             raise HTTPException(status_code=500, detail="Failed to create user")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during creation: {str(e)}")
+    invalidate_responses("users")
     
-    return UserResponse(
-        user_id=new_user.user_id,
-        first_name=new_user.first_name,
-        last_name=new_user.last_name,
-        sex=new_user.sex,
-        dob=new_user.dob,
-        nationality=new_user.nationality,
-        race=new_user.race,
-        contact_no=new_user.contact_no,
-        email=new_user.email,
-        blk=new_user.blk,
-        street=new_user.street,
-        unit_no=new_user.unit_no,
-        postcode=new_user.postcode,
-        role=new_user.role.value,
-        status=new_user.status.value,
-        registration_datetime=new_user.registration_datetime,
-        last_updated_datetime=new_user.last_updated_datetime
-    )
+    return to_user_response(new_user)
 
 @users_router.put("/{user_id}", response_model=UserResponse)
 def update_user_endpoint(
     db: db_dependency,
     user_id: int,
     data: UserRequest = Body(...),
-    current_user: Users = Depends(admin_role)  # Restricted to Admins
+    current_user: AuthPrincipal = Depends(admin_role)  # Restricted to Admins
 ):
     """
     Update a user by user_id.
@@ -160,35 +158,21 @@ def update_user_endpoint(
     - Role/status are mapped to enums.
     Accessible only by Admins.
     """
-    update_data = data.dict(exclude_unset=True)
+    update_data = data.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
 
-    # Uppercase specified fields if present
-    for field in FIELDS_TO_UPPERCASE:
-        if field in update_data and isinstance(update_data[field], str):
-            update_data[field] = update_data[field].upper()
-    
-    # Parse DOB if provided
-    if 'dob' in update_data and update_data['dob']:
-        try:
-            update_data['dob'] = datetime.strptime(update_data['dob'], "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid format for dob (use YYYY-MM-DD)")
-    
     # Handle role if provided
     if 'role' in update_data:
-        role_map = {member.value.upper(): member for member in UserRole}
         try:
-            update_data['role'] = role_map[update_data['role'].upper()]
+            update_data['role'] = USER_ROLES_BY_NAME[update_data['role']]
         except KeyError:
             raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join([m.value for m in UserRole])}")
     
     # Handle status if provided
     if 'status' in update_data:
-        status_map = {member.value.upper(): member for member in UserStatus}
         try:
-            update_data['status'] = status_map[update_data['status'].upper()]
+            update_data['status'] = USER_STATUSES_BY_NAME[update_data['status']]
         except KeyError:
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join([m.value for m in UserStatus])}")
     
@@ -196,40 +180,23 @@ def update_user_endpoint(
     if 'password' in update_data:
         update_data['password'] = get_password_hash(update_data['password'])
     
-    user_crud = CRUDOperations(Users)
     try:
-        updated_user = user_crud.update(db, user_id, update_data)
+        updated_user = user_crud.update_returning(db, user_id, update_data)
         if not updated_user:
             raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during update: {str(e)}")
+    invalidate_responses("users", "reports")  # Report listings embed the assigned IO's name
+    clear_token_cache()  # Role/status changes must apply to tokens already issued, not after the cache TTL
 
-    return UserResponse(
-        user_id=updated_user.user_id,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        sex=updated_user.sex,
-        dob=updated_user.dob,
-        nationality=updated_user.nationality,
-        race=updated_user.race,
-        contact_no=updated_user.contact_no,
-        email=updated_user.email,
-        blk=updated_user.blk,
-        street=updated_user.street,
-        unit_no=updated_user.unit_no,
-        postcode=updated_user.postcode,
-        role=updated_user.role.value,
-        status=updated_user.status.value,
-        registration_datetime=updated_user.registration_datetime,
-        last_updated_datetime=updated_user.last_updated_datetime
-    )
+    return to_user_response(updated_user)
 
 @users_router.post("/{user_id}/reset-password", status_code=204)
 def reset_password_endpoint(
     db: db_dependency,
     user_id: int,
     data: ResetPasswordRequest = Body(...),
-    current_user: Users = Depends(admin_role)  # Restricted to Admins
+    current_user: AuthPrincipal = Depends(admin_role)  # Restricted to Admins
 ):
     """
     Reset password for a user by user_id.
@@ -239,32 +206,34 @@ def reset_password_endpoint(
     """
     reset_data = {"password": get_password_hash(data.password)}
     
-    user_crud = CRUDOperations(Users)
     try:
-        updated_user = user_crud.update(db, user_id, reset_data)
+        updated_user = user_crud.update_returning(db, user_id, reset_data)
         if not updated_user:
             raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during password reset: {str(e)}")
+    invalidate_responses("users")
+    clear_token_cache()
     return None
 
 @users_router.delete("/{user_id}", status_code=204)
 def delete_user_endpoint(
     db: db_dependency,
     user_id: int,
-    current_user: Users = Depends(admin_role)  # Restricted to Admins
+    current_user: AuthPrincipal = Depends(admin_role)  # Restricted to Admins
 ):
     """
     Delete a user by user_id.
     Accessible only by Admins.
     """
-    user_crud = CRUDOperations(Users)
     try:
         deleted = user_crud.delete(db, user_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during delete: {str(e)}")
+    invalidate_responses("users", "reports")
+    clear_token_cache()
     return None
 
 
@@ -272,7 +241,7 @@ def delete_user_endpoint(
 @users_router.get("/io", response_model=IOListResponse)
 def get_ios_endpoint(
     db: db_dependency,
-    current_user: Users = Depends(get_current_active_user)  # Any active user can access
+    current_user: AuthPrincipal = Depends(get_current_active_user)  # Any active user can access
 ):
     """
     Retrieve a list of active Investigation Officers (IOs).
@@ -280,10 +249,7 @@ def get_ios_endpoint(
     Accessible by any active authenticated user.
     """
     try:
-        ios = db.query(Users).filter(
-            Users.role == UserRole.io,
-            Users.status == UserStatus.active
-        ).order_by(Users.user_id.asc()).all()
+        ios = db.execute(ACTIVE_IOS_STMT).all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error during read: {str(e)}")
     
@@ -291,10 +257,8 @@ def get_ios_endpoint(
         return IOListResponse(ios=[])
     
     enriched_ios = [
-        IOOption(
-            user_id=user.user_id,
-            full_name=f"{user.first_name} {user.last_name}"
-        ) for user in ios
+        IOOption(user_id=user_id, full_name=full_name)
+        for user_id, full_name in ios
     ]
     
     return IOListResponse(ios=enriched_ios)
\ No newline at end of file
@@ -1,6 +1,6 @@
 import sys
 import os
-from datetime import datetime
+from datetime import date
 from fuzzywuzzy import fuzz
 from copy import deepcopy
 import numpy as np
@@ -185,11 +185,11 @@ class ProfileRAGIEKBAgent:
             incident_date = preprocessed.get("scam_incident_date", "")
             if incident_date and incident_date.strip():
                 try:
-                    date_obj = datetime.strptime(incident_date, "%Y-%m-%d")
-                    current_year = datetime.now().year
+                    date_obj = date.fromisoformat(incident_date)
+                    current_year = date.today().year
                     if date_obj.year != current_year:
                         new_date = date_obj.replace(year=current_year)
-                        preprocessed["scam_incident_date"] = new_date.strftime("%Y-%m-%d")
+                        preprocessed["scam_incident_date"] = new_date.isoformat()
                 except ValueError:
                     pass
             
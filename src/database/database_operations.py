@@ -1,9 +1,10 @@
 import sys
 import os
-from typing import Any, List, Optional, Type, Dict, Union, Tuple
+from typing import Any, List, Optional, Sequence, Type, Dict, Union, Tuple
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import create_engine, text, update, func
+from sqlalchemy import Row, create_engine, delete, select, text, update, func
 from sqlalchemy.ext.declarative import DeclarativeMeta
 import pandas as pd
 from fastapi import Depends
@@ -30,9 +31,17 @@ class DatabaseManager:
                 db_url = db_url.replace("postgres://", "postgresql+psycopg://", 1)
             self.engine = create_engine(
                 db_url,
-                echo=self.settings.database.echo
+                echo=self.settings.database.echo,
+                query_cache_size=1200
             )
             self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+            # psycopg 3 serves both engines from the same URL; async sessions back the read-only list endpoints
+            self.async_engine = create_async_engine(
+                db_url,
+                echo=self.settings.database.echo,
+                query_cache_size=1200
+            )
+            self.async_session_factory = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
             self.logger.info("Database engine created successfully")
         except Exception as e:
             self.logger.error(f"Failed to create database engine: {str(e)}")
@@ -88,6 +97,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with db_manager.async_session_factory() as db:
+        yield db
+
 class CRUDOperations:
     """Generic CRUD operations for SQLAlchemy models."""
     
@@ -110,7 +123,47 @@ class CRUDOperations:
             db.rollback()
             self.logger.error(f"Error creating record: {str(e)}")
             return None
+
+    async def create_async(self, db: AsyncSession, data: Dict[str, Any]) -> Optional[Any]:
+        """Same as create, awaited on an AsyncSession."""
+        try:
+            record = self.model(**data)
+            db.add(record)
+            await db.commit()
+            await db.refresh(record)
+            self.logger.info(f"Created record with {self.pk_column}: {getattr(record, self.pk_column, 'unknown')}")
+            return record
+        except Exception as e:
+            await db.rollback()
+            self.logger.error(f"Error creating record: {str(e)}")
+            return None
+
+    def create_no_commit(self, db: Session, data: Dict[str, Any]) -> Any:
+        """
+        Add a record and flush it so its primary key is populated, leaving the transaction open.
+        For multi-row writes that commit once; errors propagate so the caller can roll back the whole unit.
+        """
+        try:
+            record = self.model(**data)
+            db.add(record)
+            db.flush()
+            self.logger.info(f"Flushed record with {self.pk_column}: {getattr(record, self.pk_column, 'unknown')}")
+            return record
+        except Exception as e:
+            self.logger.error(f"Error creating record: {str(e)}")
+            raise
     
+    async def create_no_commit_async(self, db: AsyncSession, data: Dict[str, Any]) -> Any:
+        """Same as create_no_commit, awaited on an AsyncSession."""
+        try:
+            record = self.model(**data)
+            db.add(record)
+            await db.flush()
+            self.logger.info(f"Flushed record with {self.pk_column}: {getattr(record, self.pk_column, 'unknown')}")
+            return record
+        except Exception as e:
+            self.logger.error(f"Error creating record: {str(e)}")
+            raise
     
     def create_bulk(self, db: Session, df: pd.DataFrame) -> int:
         """Create multiple records from a DataFrame."""
@@ -147,16 +200,45 @@ class CRUDOperations:
             self.logger.error(f"Error reading record: {str(e)}")
             return None
     
-    def read_all(self, db: Session, limit: int = 100, offset: int = 0) -> List[Any]:
-        """Read all records."""
+    def read_all(self, db: Session, limit: int = 100, offset: int = 0, after_id: Optional[int] = None) -> List[Any]:
+        """Read records in primary key order; pass after_id (keyset cursor) instead of offset to page from an index range."""
         try:
-            records = db.query(self.model).offset(offset).limit(limit).all()
+            pk = getattr(self.model, self.pk_column)
+            query = db.query(self.model).order_by(pk.asc())
+            query = query.filter(pk > after_id) if after_id is not None else query.offset(offset)
+            records = query.limit(limit).all()
             self.logger.info(f"Read {len(records)} records")
             return records
         except Exception as e:
             self.logger.error(f"Error reading records: {str(e)}")
             return []
     
+    def _rows_stmt(self, columns: Sequence[Any], limit: int, offset: int, after_id: Optional[int]):
+        pk = getattr(self.model, self.pk_column)
+        stmt = select(*columns).order_by(pk.asc())
+        stmt = stmt.where(pk > after_id) if after_id is not None else stmt.offset(offset)
+        return stmt.limit(limit)
+
+    def read_all_rows(self, db: Session, columns: Sequence[Any], limit: int = 100, offset: int = 0, after_id: Optional[int] = None) -> List[Row]:
+        """Read only the given columns as Core rows (no ORM entities), in primary key order; paging as in read_all."""
+        try:
+            rows = db.execute(self._rows_stmt(columns, limit, offset, after_id)).all()
+            self.logger.info(f"Read {len(rows)} rows")
+            return rows
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error reading rows: {str(e)}")
+            raise  # Re-raise so a failed read is never served (or cached) as an empty page
+
+    async def read_all_rows_async(self, db: AsyncSession, columns: Sequence[Any], limit: int = 100, offset: int = 0, after_id: Optional[int] = None) -> List[Row]:
+        """Same as read_all_rows, awaited on an AsyncSession so the event loop is not blocked."""
+        try:
+            rows = (await db.execute(self._rows_stmt(columns, limit, offset, after_id))).all()
+            self.logger.info(f"Read {len(rows)} rows")
+            return rows
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error reading rows: {str(e)}")
+            raise  # Re-raise so a failed read is never served (or cached) as an empty page
+    
     def update(self, db: Session, record_id: Union[str, int], data: Dict[str, Any]) -> Optional[Any]:
         """Update a record by ID."""
         try:
@@ -175,6 +257,46 @@ class CRUDOperations:
             db.rollback()
             self.logger.error(f"Error updating record: {str(e)}")
             return None
+    
+    def update_returning(self, db: Session, record_id: Union[str, int], data: Dict[str, Any]) -> Optional[Any]:
+        """Update a record by ID in one UPDATE ... RETURNING round trip; returns the updated record detached, or None if not found."""
+        try:
+            filter_expr = getattr(self.model, self.pk_column) == record_id
+            stmt = update(self.model).where(filter_expr).values(**data).returning(self.model)
+            record = db.execute(stmt, execution_options={"populate_existing": True}).scalar_one_or_none()
+            if record is None:
+                db.rollback()
+                self.logger.warning(f"No record found with {self.pk_column}: {record_id}")
+                return None
+            # Detach first so the commit doesn't expire the RETURNING values (which would cost a refresh SELECT)
+            db.expunge(record)
+            db.commit()
+            self.logger.info(f"Updated record with {self.pk_column}: {record_id}")
+            return record
+        except Exception as e:
+            db.rollback()
+            self.logger.error(f"Error updating record: {str(e)}")
+            return None
+
+
+    async def update_returning_async(self, db: AsyncSession, record_id: Union[str, int], data: Dict[str, Any]) -> Optional[Any]:
+        """Same as update_returning, awaited on an AsyncSession."""
+        try:
+            filter_expr = getattr(self.model, self.pk_column) == record_id
+            stmt = update(self.model).where(filter_expr).values(**data).returning(self.model)
+            record = (await db.execute(stmt, execution_options={"populate_existing": True})).scalar_one_or_none()
+            if record is None:
+                await db.rollback()
+                self.logger.warning(f"No record found with {self.pk_column}: {record_id}")
+                return None
+            db.expunge(record)
+            await db.commit()
+            self.logger.info(f"Updated record with {self.pk_column}: {record_id}")
+            return record
+        except Exception as e:
+            await db.rollback()
+            self.logger.error(f"Error updating record: {str(e)}")
+            return None
             
     def update_embedding(self, db: Session, record_id: Union[str, int], embedding: List[float], column_name: str = "embedding") -> bool:
         """Update a single record's specified embedding column."""
@@ -230,6 +352,26 @@ class CRUDOperations:
             db.rollback()
             self.logger.error(f"Unexpected error deleting record: {str(e)}")
             return False
+
+
+    async def delete_async(self, db: AsyncSession, record_id: Union[str, int]) -> bool:
+        """Same as delete, as a single DELETE awaited on an AsyncSession."""
+        try:
+            filter_expr = getattr(self.model, self.pk_column) == record_id
+            deleted_count = (await db.execute(delete(self.model).where(filter_expr))).rowcount
+            await db.commit()
+            if deleted_count > 0:
+                self.logger.info(f"Deleted record with {self.pk_column}: {record_id}")
+                return True
+            return False
+        except SQLAlchemyError as e:
+            await db.rollback()
+            self.logger.error(f"Error deleting record: {str(e)}")
+            raise  # Re-raise to bubble up to caller
+        except Exception as e:
+            await db.rollback()
+            self.logger.error(f"Unexpected error deleting record: {str(e)}")
+            return False
     
     def delete_all(self, db: Session) -> int:
         """Delete all records in the table."""
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Date, Float, Text, DateTime, CheckConstraint, Integer, Enum, ForeignKey
+from sqlalchemy import BigInteger, Column, String, Date, Float, Text, DateTime, CheckConstraint, Integer, Enum, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from pgvector.sqlalchemy import Vector
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
@@ -102,6 +102,7 @@ class PersonDetails(Base):
     person_id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
+    full_name = column_property(func.concat_ws(' ', first_name, last_name))  # Built by Postgres on load
     sex = Column(String, nullable=True)
     dob = Column(Date, nullable=True)
     nationality = Column(String, nullable=True)
@@ -128,6 +129,11 @@ class ReportPersonsLink(Base):
     person_id = Column(Integer, ForeignKey("person_details.person_id", ondelete="CASCADE"), primary_key=True, nullable=False)
     role = Column(EnumType(PersonRole), nullable=False)
     
+    # The PK leads with report_id; lookups by person_id need their own index (role included for index-only scans)
+    __table_args__ = (
+        Index('ix_report_persons_link_person_id_report_id', 'person_id', 'report_id', postgresql_include=['role']),
+    )
+    
     report = relationship("ScamReports", back_populates="pois")
     person = relationship("PersonDetails", back_populates="reports")
 
@@ -142,6 +148,7 @@ class Users(Base):
     password = Column(String, nullable=False)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
+    full_name = column_property(func.concat_ws(' ', first_name, last_name))  # Built by Postgres on load
     sex = Column(String, nullable=True)
     dob = Column(Date, nullable=True)
     nationality = Column(String, nullable=True)
@@ -157,6 +164,12 @@ class Users(Base):
     registration_datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now()) #Use server default for timestamp
     last_updated_datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now(),onupdate=func.now()) #Use server default for timestamp
 
+    # The one index on email: enforces uniqueness (signup already rejects duplicates) and covers the
+    # login and token lookups, so neither touches the heap
+    __table_args__ = (
+        Index('ix_users_email_login', 'email', unique=True, postgresql_include=['user_id', 'password', 'role', 'status']),
+    )
+
     reports_in_charge = relationship("ScamReports", back_populates="io")
 
 class Conversations(Base):
@@ -171,7 +184,7 @@ class Conversations(Base):
     creation_datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
    
     report = relationship("ScamReports", back_populates="conversations")
-    messages = relationship("Messages", back_populates="conversation", cascade="all, delete, delete-orphan")
+    messages = relationship("Messages", back_populates="conversation", cascade="all, delete, delete-orphan", order_by="Messages.message_id")
    
 class Messages(Base):
     """
@@ -187,5 +200,22 @@ class Messages(Base):
     content = Column(Text, nullable=False)
     sent_datetime = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     
+    # Serves the per-conversation messages load and first-message preview, both ordered by message_id
+    __table_args__ = (
+        Index('ix_messages_conversation_id_message_id', 'conversation_id', 'message_id'),
+    )
+    
     conversation = relationship("Conversations", back_populates="messages")
-    
\ No newline at end of file
+    
+
+class TableVersions(Base):
+    """
+    Data model for table_versions table.
+    One write counter per tracked table (scam_reports, report_persons_link, person_details, users). A statement-level
+    trigger bumps the counter in the same transaction as every INSERT/UPDATE/DELETE on that table (migration e5c19a7d4f02),
+    so cached list responses key on these instead of scanning the tables.
+    """
+    __tablename__ = 'table_versions'
+
+    table_name = Column(String, primary_key=True, nullable=False)
+    version = Column(BigInteger, nullable=False, server_default=text('0'))
@@ -1,9 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.main import app  
-from app.dependencies.db import get_db  
+from app.dependencies.db import get_db, get_async_db
 from app.dependencies.auth import get_current_active_user  
+from app.cache import clear_response_cache
 
 @pytest.fixture(scope="function")
 def client(mocker):
@@ -11,6 +13,9 @@ def client(mocker):
     # Mock DB session (returns a mock Session object)
     mock_db = mocker.MagicMock(spec=Session)
     app.dependency_overrides[get_db] = lambda: mock_db
+    # Async session for the async list endpoints; awaited methods are AsyncMocks
+    mock_async_db = mocker.AsyncMock(spec=AsyncSession)
+    app.dependency_overrides[get_async_db] = lambda: mock_async_db
 
     # Mock current user (for auth-protected endpoints)
     mock_user = mocker.MagicMock()  
@@ -24,4 +29,16 @@ def client(mocker):
 @pytest.fixture(scope="function")
 def mock_db(mocker, client):  # Access the mocked DB from client fixture
     """Fixture to get the mocked DB session."""
-    return app.dependency_overrides[get_db]()
\ No newline at end of file
+    return app.dependency_overrides[get_db]()
+
+@pytest.fixture(scope="function")
+def mock_async_db(mocker, client):
+    """Fixture to get the mocked async DB session."""
+    return app.dependency_overrides[get_async_db]()
+
+@pytest.fixture(autouse=True)
+def reset_response_cache():
+    """Keep cached list responses from leaking between tests."""
+    clear_response_cache()
+    yield
+    clear_response_cache()
@@ -1,7 +1,7 @@
 import pytest
 from fastapi import status
 from app.main import app
-from app.dependencies.auth import get_current_active_user
+from app.dependencies.auth import get_current_active_user, get_current_user_profile
 from sqlalchemy.exc import SQLAlchemyError
 from src.models.data_model import UserRole, UserStatus, Users  
 from app.dependencies.auth import authenticate_user, create_access_token, get_password_hash 
@@ -97,7 +97,7 @@ def test_read_users_me(client, mocker, mock_db):
     """Test /api/auth/users/me endpoint for user profile."""
     # Mock current_user
     mock_user = Users(email="me@example.com", first_name="Me", last_name="User", contact_no="123", role=UserRole.io, status=UserStatus.active)
-    app.dependency_overrides[get_current_active_user] = lambda: mock_user  
+    app.dependency_overrides[get_current_user_profile] = lambda: mock_user  
 
     response = client.get("/api/auth/users/me")
     assert response.status_code == status.HTTP_200_OK
@@ -1,8 +1,12 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
-from unittest.mock import MagicMock, patch
+from unittest.mock import DEFAULT, AsyncMock, MagicMock, patch
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.main import app  
 from app.routers.public_reports import get_vector_store 
@@ -19,8 +23,11 @@ def reset_managers():
 
 @pytest.fixture
 def mock_crud_operations():
-    with patch("app.routers.public_reports.CRUDOperations") as mock_crud:
-        yield mock_crud
+    with patch.multiple(
+        "app.routers.public_reports",
+        person_crud=DEFAULT, report_crud=DEFAULT, link_crud=DEFAULT
+    ) as mock_cruds:
+        yield mock_cruds
 
 # Fixture to mock ConversationManager 
 @pytest.fixture
@@ -49,36 +56,15 @@ def mock_conversation_manager():
         yield instance
 
 
-def test_submit_public_report_success(client: TestClient, mock_db: Session, mock_crud_operations):
-    # Mock query for conversation 
+def test_submit_public_report_success(client: TestClient, mock_async_db: MagicMock, mock_crud_operations):
+    # Mock lookup for conversation 
     mock_conv = MagicMock(conversation_id=2)
-    mock_db.query.return_value.filter.return_value.first.return_value = mock_conv
-
-    # Pre-create specific CRUD mocks
-    person_crud_mock = MagicMock()
-    person_crud_mock.create.return_value = MagicMock(person_id=1)
-    
-    report_crud_mock = MagicMock()
-    report_crud_mock.create.return_value = MagicMock(report_id=1)
-    
-    link_crud_mock = MagicMock()
-    link_crud_mock.create.return_value = MagicMock()
-    
-    conv_crud_mock = MagicMock()
-    conv_crud_mock.update.return_value = mock_conv
-
-    def crud_side_effect(model):
-        if model == PersonDetails:
-            return person_crud_mock
-        elif model == ScamReports:
-            return report_crud_mock
-        elif model == ReportPersonsLink:
-            return link_crud_mock
-        elif model == Conversations:
-            return conv_crud_mock
-        return MagicMock()  
-
-    mock_crud_operations.side_effect = crud_side_effect
+    mock_async_db.get.return_value = mock_conv
+
+    # Module-level CRUD singletons
+    mock_crud_operations["person_crud"].create_no_commit_async = AsyncMock(return_value=MagicMock(person_id=1))
+    mock_crud_operations["report_crud"].create_no_commit_async = AsyncMock(return_value=MagicMock(report_id=1))
+    mock_crud_operations["link_crud"].create_no_commit_async = AsyncMock(return_value=MagicMock())
 
 
     mocked_vs = MagicMock(spec=VectorStore)
@@ -102,10 +88,92 @@ def test_submit_public_report_success(client: TestClient, mock_db: Session, mock
     assert response.json()["report_id"] == 1
     assert response.json()["conversation_id"] == 2
 
+    # Person, report, link and conversation update go out in a single commit
+    assert mock_conv.report_id == 1
+    mock_async_db.commit.assert_awaited_once()
     mocked_vs.get_embedding.assert_called_once_with("I was scammed via email.")
+    report_data = mock_crud_operations["report_crud"].create_no_commit_async.await_args.args[1]
+    assert report_data["embedding"] == [0.1] * 384
+
+    del app.dependency_overrides[get_vector_store]
+
+def test_submit_public_report_person_insert_fails(client: TestClient, mock_async_db: MagicMock, mock_crud_operations):
+    mock_crud_operations["person_crud"].create_no_commit_async = AsyncMock(side_effect=SQLAlchemyError("insert failed"))
+    mock_crud_operations["report_crud"].create_no_commit_async = AsyncMock()
+
+    mocked_vs = MagicMock(spec=VectorStore)
+    mocked_vs.get_embedding.return_value = [0.1] * 384
+    app.dependency_overrides[get_vector_store] = lambda: mocked_vs
+
+    response = client.post("/public/reports/submit", json={
+        "first_name": "John",
+        "last_name": "Doe",
+        "contact_no": "+123456789",
+        "email": "john@example.com",
+        "scam_incident_date": "2023-01-01",
+        "scam_incident_description": "I was scammed via email.",
+        "role": "victim",
+    })
+
+    assert response.status_code == 500
+    assert "insert failed" in response.json()["detail"]
+    mock_async_db.rollback.assert_awaited_once()
+    mock_async_db.commit.assert_not_awaited()
+    mock_crud_operations["report_crud"].create_no_commit_async.assert_not_awaited()
+
+    del app.dependency_overrides[get_vector_store]
+
+def test_submit_public_report_embeds_before_first_insert(client: TestClient, mock_async_db: MagicMock, mock_crud_operations):
+    embedded = threading.Event()
+    mocked_vs = MagicMock(spec=VectorStore)
+    def slow_embedding(text):
+        time.sleep(0.05)
+        embedded.set()
+        return [0.1] * 384
+    mocked_vs.get_embedding.side_effect = slow_embedding
+    app.dependency_overrides[get_vector_store] = lambda: mocked_vs
+
+    # The first flush takes the table_versions row lock, so the embedding must already be resolved
+    embedded_at_insert = []
+    async def create_person(db, person_data):
+        embedded_at_insert.append(embedded.is_set())
+        return MagicMock(person_id=1)
+    mock_crud_operations["person_crud"].create_no_commit_async = AsyncMock(side_effect=create_person)
+    mock_crud_operations["report_crud"].create_no_commit_async = AsyncMock(return_value=MagicMock(report_id=1))
+    mock_crud_operations["link_crud"].create_no_commit_async = AsyncMock()
+
+    response = client.post("/public/reports/submit", json={
+        "first_name": "John",
+        "last_name": "Doe",
+        "contact_no": "+123456789",
+        "email": "john@example.com",
+        "scam_incident_date": "2023-01-01",
+        "scam_incident_description": "I was scammed via email.",
+        "role": "victim",
+    })
+
+    assert response.status_code == 200
+    assert embedded_at_insert == [True]
+    mock_async_db.commit.assert_awaited_once()
 
     del app.dependency_overrides[get_vector_store]
 
+def test_get_vector_store_builds_once(monkeypatch):
+    import app.dependencies.vector_store as vector_store_module
+    monkeypatch.setattr(vector_store_module, "_vector_store", None)
+    built = []
+    def slow_vector_store(session_factory):
+        time.sleep(0.05)  # Widen the first-use window
+        built.append(session_factory)
+        return MagicMock(spec=VectorStore)
+    monkeypatch.setattr(vector_store_module, "VectorStore", slow_vector_store)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        stores = list(pool.map(lambda _: vector_store_module.get_vector_store(), range(4)))
+
+    assert len(built) == 1
+    assert all(store is stores[0] for store in stores)
+
 def test_submit_public_report_missing_fields(client: TestClient):
     request_data = {
         "first_name": "John",
@@ -193,4 +261,40 @@ def test_send_message_error(client: TestClient, mock_conversation_manager):
 
     assert response.status_code == 500
     assert "detail" in response.json()
-    assert "Mock error" in response.json()["detail"]
\ No newline at end of file
+    assert "Mock error" in response.json()["detail"]
+
+
+def test_send_message_managers_bounded(client: TestClient, mock_conversation_manager, monkeypatch):
+    monkeypatch.setattr("app.routers.chat.MANAGER_MAXSIZE", 2)
+
+    for conversation_id in (1, 2, 3):
+        response = client.post("/chat/message", json={"query": "Hello", "conversation_id": conversation_id})
+        assert response.status_code == 200
+
+    # Least recently used conversation is evicted first
+    assert list(managers) == [2, 3]
+
+    # A conversation mid-turn keeps its entry (and lock); the next idle one goes instead
+    manager, _, expires = managers[2]
+    managers[2] = (manager, MagicMock(**{"locked.return_value": True}), expires)
+    response = client.post("/chat/message", json={"query": "Hello", "conversation_id": 4})
+    assert response.status_code == 200
+    assert list(managers) == [2, 4]
+
+def test_websocket_closes_on_agent_timeout(client: TestClient, mock_conversation_manager, monkeypatch):
+    monkeypatch.setattr("app.routers.chat.AGENT_TIMEOUT", 0.05)
+    mock_conversation_manager.process_user_query.side_effect = lambda *args: time.sleep(0.2)
+
+    with client.websocket_connect("/chat/ws/1") as websocket:
+        websocket.send_text("Hello")
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_text()
+
+        # The abandoned call is still running in its thread, so the conversation stays locked until it returns
+        lock = managers[1][1]
+        assert lock.locked()
+        deadline = time.monotonic() + 1
+        while lock.locked() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not lock.locked()
+    assert exc_info.value.code == 1011
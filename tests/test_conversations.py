@@ -32,17 +32,17 @@ from app.model import ConversationListResponse
         (None, status.HTTP_500_INTERNAL_SERVER_ERROR, None, "Database error during read: DB error"),
     ]
 )
-def test_get_conversations_endpoint(client, mocker, mock_db, mock_conversations, expected_status, expected_count, expected_detail):
+def test_get_conversations_endpoint(client, mocker, mock_async_db, mock_conversations, expected_status, expected_count, expected_detail):
     """Test /conversations/ GET endpoint for listing conversations."""
     # Mock admin role 
     mock_user = Users(role=UserRole.admin)
     app.dependency_overrides[admin_role] = lambda db=None, current_user=None: mock_user
 
     if mock_conversations is None:
-        mock_db.query.side_effect = SQLAlchemyError("DB error")
+        mock_async_db.stream_scalars.side_effect = SQLAlchemyError("DB error")
     else:
-        mock_query_chain = mock_db.query.return_value.options.return_value.order_by.return_value.offset.return_value.limit.return_value.all
-        mock_query_chain.return_value = mock_conversations
+        mock_async_db.stream_scalars.return_value = mocker.MagicMock()
+        mock_async_db.stream_scalars.return_value.__aiter__.return_value = mock_conversations
 
     response = client.get("/conversations/")
     assert response.status_code == expected_status
@@ -62,6 +62,23 @@ def test_get_conversations_endpoint(client, mocker, mock_db, mock_conversations,
     else:
         assert response.json()["detail"] == expected_detail
 
+def test_get_conversations_summaries_only(client, mocker, mock_async_db):
+    """Test /conversations/?include_messages=false returns SQL-computed summaries without messages."""
+    app.dependency_overrides[admin_role] = lambda db=None, current_user=None: Users(role=UserRole.admin)
+    mock_async_db.execute.return_value = mocker.MagicMock()
+    mock_async_db.execute.return_value.all.return_value = [
+        (1, None, datetime.datetime.fromisoformat("2023-01-01T00:00:00"), "Hello"),
+        (2, 7, datetime.datetime.fromisoformat("2023-01-02T00:00:00"), None),
+    ]
+
+    response = client.get("/conversations/", params={"include_messages": "false"})
+    assert response.status_code == status.HTTP_200_OK
+    conversations = response.json()["conversations"]
+    assert [c["summary"] for c in conversations] == ["Hello...", "No messages"]
+    assert all(c["messages"] == [] for c in conversations)
+    assert conversations[1]["reportId"] == "7"
+    mock_async_db.stream_scalars.assert_not_called()
+
 @pytest.mark.parametrize(
     "conversation_id, mock_delete_result, expected_status, expected_detail",
     [
@@ -2,14 +2,16 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock
+from collections import namedtuple
 from datetime import date
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.main import app  
 from app.dependencies.db import get_db  
 from app.dependencies.auth import get_current_active_user  
 from src.models.data_model import PersonDetails, UserRole, UserStatus, ReportPersonsLink, ScamReports, ReportStatus, PersonRole
 from app.model import PersonResponse, LinkedReport
-from app.routers.persons import CRUDOperations  
+from app.routers.persons import CRUDOperations, PERSON_LIST_COLUMNS
 
 
 @pytest.fixture(scope="function")
@@ -32,11 +34,17 @@ def mock_person():
     person.postcode = None
     return person
 
-def test_get_persons(client: TestClient, mock_db: MagicMock, mocker, mock_person):
+@pytest.fixture(scope="function")
+def mock_person_row(mock_person):
+    """Fixture for a projected list row (PERSON_LIST_COLUMNS), as read_all_rows_async returns."""
+    PersonRow = namedtuple("PersonRow", [column.key for column in PERSON_LIST_COLUMNS])
+    return PersonRow(*(getattr(mock_person, field) for field in PersonRow._fields))
+
+def test_get_persons(client: TestClient, mock_async_db: MagicMock, mocker, mock_person_row):
     """Test GET /persons/ - retrieve list of persons with pagination."""
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.read_all.return_value = [mock_person]
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.return_value = [mock_person_row]
+    mock_async_db.execute.return_value = MagicMock()  # PERSONS_VERSION_STMT
 
     response = client.get("/persons/?limit=10&offset=0")
     assert response.status_code == 200
@@ -46,7 +54,61 @@ def test_get_persons(client: TestClient, mock_db: MagicMock, mocker, mock_person
     assert data["persons"][0]["first_name"] == "JOHN"
 
     # Verify CRUD call
-    mock_crud_instance.read_all.assert_called_once_with(mock_db, limit=10, offset=0)
+    mock_crud_instance.read_all_rows_async.assert_awaited_once_with(mock_async_db, PERSON_LIST_COLUMNS, limit=10, offset=0, after_id=None)
+
+def test_get_persons_cached_until_write(client: TestClient, mock_async_db: MagicMock, mocker, mock_person, mock_person_row):
+    """Test GET /persons/ - repeat reads are served from cache until a person is created."""
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.return_value = [mock_person_row]
+    mock_crud_instance.create_async.return_value = mock_person
+    mock_async_db.execute.return_value = MagicMock()  # PERSONS_VERSION_STMT
+
+    first = client.get("/persons/?limit=10")
+    second = client.get("/persons/?limit=10")
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert mock_crud_instance.read_all_rows_async.call_count == 1
+
+    response = client.post("/persons/", json={"first_name": "Jane", "last_name": "Doe", "contact_no": "87654321", "email": "jane.doe@example.com"})
+    assert response.status_code == 200
+    client.get("/persons/?limit=10")
+    assert mock_crud_instance.read_all_rows_async.call_count == 2
+
+def test_get_persons_not_modified(client: TestClient, mock_async_db: MagicMock, mocker, mock_person_row):
+    """Test GET /persons/ - a matching If-None-Match gets 304 without reading the page."""
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.return_value = [mock_person_row]
+    mock_async_db.execute.return_value = MagicMock()
+    mock_async_db.execute.return_value.scalars.return_value = [4]
+
+    etag = client.get("/persons/?limit=10").headers["ETag"]
+    response = client.get("/persons/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert mock_crud_instance.read_all_rows_async.await_count == 1
+
+    # Another worker's write changes the version, so the old ETag no longer matches
+    mock_async_db.execute.return_value.scalars.return_value = [5]
+    response = client.get("/persons/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert mock_crud_instance.read_all_rows_async.await_count == 2
+
+def test_get_persons_read_error_not_cached(client: TestClient, mock_async_db: MagicMock, mocker, mock_person_row):
+    """Test GET /persons/ - a failed read returns 500 and is not cached as an empty page."""
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.side_effect = SQLAlchemyError("connection lost")
+    mock_async_db.execute.return_value = MagicMock()  # PERSONS_VERSION_STMT
+
+    response = client.get("/persons/?limit=10")
+    assert response.status_code == 500
+    assert "etag" not in response.headers
+
+    # Same table version, so a cached page would be served; instead the read is retried
+    mock_crud_instance.read_all_rows_async.side_effect = None
+    mock_crud_instance.read_all_rows_async.return_value = [mock_person_row]
+    response = client.get("/persons/?limit=10")
+    assert response.status_code == 200
+    assert len(response.json()["persons"]) == 1
+    assert mock_crud_instance.read_all_rows_async.await_count == 2
 
 @pytest.mark.parametrize("invalid_params, expected_status", [
     ({"limit": "invalid"}, 422),  # Invalid type for limit
@@ -57,7 +119,7 @@ def test_get_persons_invalid_params(client: TestClient, invalid_params, expected
     response = client.get("/persons/", params=invalid_params)
     assert response.status_code == expected_status
 
-def test_create_person(client: TestClient, mock_db: MagicMock, mocker, mock_person):
+def test_create_person(client: TestClient, mock_async_db: MagicMock, mocker, mock_person):
     """Test POST /persons/ - create a new person."""
     payload = {
         "first_name": "Jane",
@@ -67,13 +129,12 @@ def test_create_person(client: TestClient, mock_db: MagicMock, mocker, mock_pers
         "dob": "1990-01-01"
     }
 
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
     mock_person.dob = date(1990, 1, 1)
     mock_person.person_id = 2
     mock_person.first_name = "JANE"
     mock_person.last_name = "DOE"
-    mock_crud_instance.create.return_value = mock_person
+    mock_crud_instance.create_async.return_value = mock_person
 
     response = client.post("/persons/", json=payload)
     assert response.status_code == 200
@@ -89,11 +150,11 @@ def test_create_person(client: TestClient, mock_db: MagicMock, mocker, mock_pers
         "email": "jane.doe@example.com",
         "dob": date(1990, 1, 1)
     }
-    mock_crud_instance.create.assert_called_once_with(mock_db, expected_data)
+    mock_crud_instance.create_async.assert_awaited_once_with(mock_async_db, expected_data)
 
 @pytest.mark.parametrize("invalid_payload, expected_status, expected_detail", [
     ({"first_name": "Jane"}, 400, "Missing required fields"),  
-    ({"first_name": "Jane", "last_name": "Doe", "contact_no": "12345678", "email": "jane@example.com", "dob": "invalid"}, 400, "Invalid format for dob"),
+    ({"first_name": "Jane", "last_name": "Doe", "contact_no": "12345678", "email": "jane@example.com", "dob": "invalid"}, 422, None),
 ])
 def test_create_person_invalid(client: TestClient, invalid_payload, expected_status, expected_detail):
     """Test POST /persons/ with invalid data (error cases)."""
@@ -102,16 +163,15 @@ def test_create_person_invalid(client: TestClient, invalid_payload, expected_sta
     if expected_detail:
         assert expected_detail in response.json().get("detail", "")
 
-def test_update_person(client: TestClient, mock_db: MagicMock, mocker, mock_person):
+def test_update_person(client: TestClient, mock_async_db: MagicMock, mocker, mock_person):
     """Test PUT /persons/{person_id} - update a person."""
     person_id = 1
     payload = {"first_name": "Updated John", "dob": "1980-05-05"}
 
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
     mock_person.first_name = "UPDATED JOHN"
     mock_person.dob = date(1980, 5, 5)
-    mock_crud_instance.update.return_value = mock_person
+    mock_crud_instance.update_returning_async.return_value = mock_person
 
     response = client.put(f"/persons/{person_id}", json=payload)
     assert response.status_code == 200
@@ -124,52 +184,46 @@ def test_update_person(client: TestClient, mock_db: MagicMock, mocker, mock_pers
         "first_name": "UPDATED JOHN",
         "dob": date(1980, 5, 5)
     }
-    mock_crud_instance.update.assert_called_once_with(mock_db, person_id, expected_update)
+    mock_crud_instance.update_returning_async.assert_awaited_once_with(mock_async_db, person_id, expected_update)
 
-def test_update_person_not_found(client: TestClient, mock_db: MagicMock, mocker):
+def test_update_person_not_found(client: TestClient, mock_async_db: MagicMock, mocker):
     """Test PUT /persons/{person_id} - not found error."""
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = None
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.update_returning_async.return_value = None
 
     response = client.put("/persons/9999", json={"first_name": "Nonexistent"})
     assert response.status_code == 404
     assert "not found" in response.json()["detail"]
 
-def test_delete_person(client: TestClient, mock_db: MagicMock, mocker):
+def test_delete_person(client: TestClient, mock_async_db: MagicMock, mocker):
     """Test DELETE /persons/{person_id} - delete a person."""
     person_id = 1
 
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.delete.return_value = True
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.delete_async.return_value = True
 
     response = client.delete(f"/persons/{person_id}")
     assert response.status_code == 204
 
     # Verify CRUD call
-    mock_crud_instance.delete.assert_called_once_with(mock_db, person_id)
+    mock_crud_instance.delete_async.assert_awaited_once_with(mock_async_db, person_id)
 
-def test_delete_person_not_found(client: TestClient, mock_db: MagicMock, mocker):
+def test_delete_person_not_found(client: TestClient, mock_async_db: MagicMock, mocker):
     """Test DELETE /persons/{person_id} - not found error."""
-    mock_crud_class = mocker.patch('app.routers.persons.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.delete.return_value = False
+    mock_crud_instance = mocker.patch('app.routers.persons.person_crud', autospec=True)
+    mock_crud_instance.delete_async.return_value = False
 
     response = client.delete("/persons/9999")
     assert response.status_code == 404
     assert "not found" in response.json()["detail"]
 
-def test_get_linked_reports(client: TestClient, mock_db: MagicMock):
+def test_get_linked_reports(client: TestClient, mock_async_db: MagicMock):
     """Test GET /persons/{person_id}/linked_reports - retrieve linked reports."""
     person_id = 1
 
-    # Mock link
-    mock_link = MagicMock(spec=ReportPersonsLink)
-    mock_link.report_id = 100
-    mock_link.role = PersonRole.victim 
-
-    mock_db.query.return_value.filter.return_value.all.return_value = [mock_link]
+    # Mock projected (report_id, role) rows
+    mock_async_db.execute.return_value = MagicMock()
+    mock_async_db.execute.return_value.all.return_value = [(100, PersonRole.victim)]
 
     response = client.get(f"/persons/{person_id}/linked_reports")
     assert response.status_code == 200
@@ -179,21 +233,41 @@ def test_get_linked_reports(client: TestClient, mock_db: MagicMock):
     assert data[0]["role"] == "victim"  
 
     # Verify calls
-    mock_db.query.assert_called_with(ReportPersonsLink)
-    mock_db.query.return_value.filter.assert_called_once()
+    mock_async_db.execute.assert_awaited_once()
+    assert mock_async_db.execute.call_args.args[1] == {"person_id": person_id}
 
-def test_get_linked_reports_no_links(client: TestClient, mock_db: MagicMock):
+def test_get_linked_reports_no_links(client: TestClient, mock_async_db: MagicMock):
     """Test GET /persons/{person_id}/linked_reports - no links."""
-    mock_db.query.return_value.filter.return_value.all.return_value = []
+    mock_async_db.execute.return_value = MagicMock()
+    mock_async_db.execute.return_value.all.return_value = []
 
     response = client.get("/persons/1/linked_reports")
     assert response.status_code == 200
     assert response.json() == []
 
-def test_get_linked_reports_not_found(client: TestClient, mock_db: MagicMock):
+def test_get_linked_reports_not_found(client: TestClient, mock_async_db: MagicMock):
     """Test GET /persons/{person_id}/linked_reports - person not found (returns empty)."""
-    mock_db.query.return_value.filter.return_value.all.return_value = []
+    mock_async_db.execute.return_value = MagicMock()
+    mock_async_db.execute.return_value.all.return_value = []
 
     response = client.get("/persons/9999/linked_reports")
     assert response.status_code == 200
-    assert response.json() == []
\ No newline at end of file
+    assert response.json() == []
+
+
+def test_get_linked_reports_batch(client: TestClient, mock_async_db: MagicMock):
+    """Test POST /persons/linked_reports:batch - linked reports for several persons in one query."""
+    mock_async_db.execute.return_value = MagicMock()
+    mock_async_db.execute.return_value.all.return_value = [
+        (1, 100, PersonRole.victim),
+        (1, 101, PersonRole.witness),
+    ]
+
+    response = client.post("/persons/linked_reports:batch", json={"ids": [1, 2]})
+    assert response.status_code == 200
+    assert response.json() == {
+        "1": [{"report_id": "100", "role": "victim"}, {"report_id": "101", "role": "witness"}],
+        "2": [],
+    }
+    mock_async_db.execute.assert_awaited_once()
+    assert mock_async_db.execute.call_args.args[1] == {"person_ids": [1, 2]}
@@ -8,7 +8,7 @@ from src.database.vector_operations import VectorStore
 from src.models.data_model import ScamReports, Users, ReportPersonsLink, PersonDetails, ReportStatus, PersonRole
 from app.model import ScamReportListResponse, ScamReportResponse, ReportRequest, LinkedPerson, LinkedPersonCreate
 from app.routers.reports import CRUDOperations
-from app.routers.reports import get_vector_store
+from app.routers.reports import get_vector_store, LINKED_PERSONS_BATCH_STMT, REPORTS_VERSION_STMT
 
 # Fixtures for mock objects
 @pytest.fixture
@@ -42,6 +42,7 @@ def mock_io():
     io.user_id = 1
     io.first_name = "Jane"
     io.last_name = "Officer"
+    io.full_name = "Jane Officer"
     return io
 
 @pytest.fixture
@@ -51,6 +52,7 @@ def mock_person():
     person.person_id = 1
     person.first_name = "John"
     person.last_name = "Doe"
+    person.full_name = "John Doe"
     
     person._sa_instance_state = MagicMock() 
     
@@ -66,16 +68,21 @@ def mock_link(mock_report, mock_person):
     link.person = mock_person  
     return link
 
-def test_get_reports(client: TestClient, mock_db: MagicMock, mock_report, mock_io, mock_link):
+def _mock_report_page(mock_async_db, version, report_rows, person_rows):
+    """Route each awaited execute() to the version, page or linked-persons result by statement."""
+    results = {REPORTS_VERSION_STMT: MagicMock(), LINKED_PERSONS_BATCH_STMT: MagicMock()}
+    results[REPORTS_VERSION_STMT].scalars.return_value = version
+    results[LINKED_PERSONS_BATCH_STMT].all.return_value = person_rows
+    page = MagicMock()
+    page.all.return_value = report_rows
+    mock_async_db.execute.side_effect = lambda stmt, *args, **kwargs: results.get(stmt, page)
+    return results
+
+def test_get_reports(client: TestClient, mock_async_db: MagicMock, mock_report):
     """Test GET /reports/ - retrieve list of reports with pagination."""
-    mock_report.io = mock_io
-    mock_report.pois = [mock_link]
-    mock_query = mock_db.query.return_value
-    mock_query.options.return_value = mock_query 
-    mock_query.order_by.return_value = mock_query
-    mock_query.offset.return_value = mock_query
-    mock_query.limit.return_value = mock_query
-    mock_query.all.return_value = [mock_report]
+    mock_report.io_id = 1
+    mock_report.io_name = "Jane Officer"
+    _mock_report_page(mock_async_db, [3, 1, 1, 2], [mock_report], [(1, 1, "John Doe", PersonRole.victim)])
 
     response = client.get("/reports/?limit=10&offset=0")
     assert response.status_code == 200
@@ -87,8 +94,38 @@ def test_get_reports(client: TestClient, mock_db: MagicMock, mock_report, mock_i
     assert len(data["reports"][0]["linked_persons"]) == 1
     assert data["reports"][0]["linked_persons"][0]["role"] == "victim"
 
-    # Verify query calls
-    mock_db.query.assert_called_once_with(ScamReports)
+    # Verify query calls: table versions, the page, then linked persons for the whole page
+    assert mock_async_db.execute.await_count == 3
+    assert mock_async_db.execute.await_args.args == (LINKED_PERSONS_BATCH_STMT, {"report_ids": [1]})
+
+def test_get_reports_cache_keyed_on_version(client: TestClient, mock_async_db: MagicMock, mock_report):
+    """Test GET /reports/ - a cached page is reused until a table_versions counter changes."""
+    mock_report.io_id = None
+    mock_report.io_name = None
+    results = _mock_report_page(mock_async_db, [3, 1, 1, 2], [mock_report], [])
+
+    client.get("/reports/?limit=10")
+    client.get("/reports/?limit=10")
+    assert mock_async_db.execute.await_count == 4  # Second request: version check only
+
+    results[REPORTS_VERSION_STMT].scalars.return_value = [3, 2, 1, 2]  # Link written by another worker
+    client.get("/reports/?limit=10")
+    assert mock_async_db.execute.await_count == 7
+
+def test_get_reports_not_modified(client: TestClient, mock_async_db: MagicMock, mock_report):
+    """Test GET /reports/ - a matching If-None-Match gets 304 without running the page query."""
+    mock_report.io_id = None
+    mock_report.io_name = None
+    _mock_report_page(mock_async_db, [3, 1, 1, 2], [mock_report], [])
+
+    first = client.get("/reports/?limit=10")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, max-age=0, must-revalidate"
+
+    response = client.get("/reports/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert mock_async_db.execute.await_count == 4  # Second request: version check only
 
 @pytest.mark.parametrize("invalid_params, expected_status", [
     ({"limit": "invalid"}, 422),  
@@ -117,12 +154,11 @@ def test_create_report(client: TestClient, mock_db: MagicMock, mocker, mock_repo
     mock_db.commit.return_value = None
     mock_db.refresh.return_value = None
 
-    mock_query = mock_db.query.return_value
-    mock_query.options.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.first.return_value = mock_report
-    mock_report.io = mock_io
-    mock_report.pois = [mock_link]
+    # Re-read as Core rows: the report row, then its linked persons
+    mock_report.io_id = mock_io.user_id
+    mock_report.io_name = mock_io.full_name
+    mock_db.execute.return_value.first.return_value = mock_report
+    mock_db.execute.return_value.all.return_value = [(mock_report.report_id, 1, "John Doe", mock_link.role)]
 
     response = client.post("/reports/", json=payload)
     assert response.status_code == 200
@@ -130,6 +166,9 @@ def test_create_report(client: TestClient, mock_db: MagicMock, mocker, mock_repo
     assert data["scam_type"] == "PHISHING"  
     assert data["scam_incident_description"] == "Test description"
 
+    assert data["assigned_IO"] == "Jane Officer"
+    assert data["linked_persons"] == [{"id": "1", "name": "John Doe", "role": "victim"}]
+
     mock_db.add.assert_called()  
     mock_db.commit.assert_called()
     mock_vector_store.get_embedding.assert_called_once_with("Test description")
@@ -137,7 +176,7 @@ def test_create_report(client: TestClient, mock_db: MagicMock, mocker, mock_repo
 @pytest.mark.parametrize("invalid_payload, expected_status, expected_detail", [
     ({"scam_type": "phishing"}, 400, "Missing required fields"),  # Missing dates/description
     ({"scam_incident_date": "2023-01-01", "scam_report_date": "2023-01-02", "scam_incident_description": ""}, 400, "cannot be empty"),  # Empty description
-    ({"scam_incident_date": "invalid", "scam_report_date": "2023-01-02", "scam_incident_description": "desc"}, 400, "Invalid date format"),  # Bad date
+    ({"scam_incident_date": "invalid", "scam_report_date": "2023-01-02", "scam_incident_description": "desc"}, 422, None),  # Bad date
 ])
 def test_create_report_invalid(client: TestClient, invalid_payload, expected_status, expected_detail):
     """Test POST /reports/ with invalid data."""
@@ -157,35 +196,32 @@ def test_update_report(client: TestClient, mock_db: MagicMock, mocker, mock_repo
     app.dependency_overrides[get_vector_store] = lambda: mock_vector_store
 
     # Mock CRUD for update
-    mock_crud_class = mocker.patch('app.routers.reports.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = mock_report  # Main update
+    mock_crud_instance = mocker.patch('app.routers.reports.scam_crud', autospec=True)
+    mock_crud_instance.update_returning.return_value = mock_report  # Main update
     mock_crud_instance.update_embedding.return_value = True
 
 
     mock_report.scam_type = "UPDATED PHISHING"
     mock_report.scam_incident_description = "Updated desc"
 
-    mock_query = mock_db.query.return_value
-    mock_query.options.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.first.return_value = mock_report
-    mock_report.io = mock_io
-    mock_report.pois = [mock_link]
+    # Re-read as Core rows: the report row, then its linked persons
+    mock_report.io_id = mock_io.user_id
+    mock_report.io_name = mock_io.full_name
+    mock_db.execute.return_value.first.return_value = mock_report
+    mock_db.execute.return_value.all.return_value = [(mock_report.report_id, 1, "John Doe", mock_link.role)]
 
     response = client.put(f"/reports/{report_id}", json=payload)
     assert response.status_code == 200
     data = response.json()
     assert data["scam_type"] == "UPDATED PHISHING"  
 
-    mock_crud_instance.update.assert_called_once()
+    mock_crud_instance.update_returning.assert_called_once()
     mock_vector_store.get_embedding.assert_called_once_with("Updated desc")
 
 def test_update_report_not_found(client: TestClient, mock_db: MagicMock, mocker):
     """Test PUT /reports/{report_id} - not found."""
-    mock_crud_class = mocker.patch('app.routers.reports.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = None
+    mock_crud_instance = mocker.patch('app.routers.reports.scam_crud', autospec=True)
+    mock_crud_instance.update_returning.return_value = None
 
     response = client.put("/reports/9999", json={"scam_type": "nonexistent"})
     assert response.status_code == 404
@@ -194,8 +230,7 @@ def test_update_report_not_found(client: TestClient, mock_db: MagicMock, mocker)
 def test_delete_report(client: TestClient, mock_db: MagicMock, mocker):
     """Test DELETE /reports/{report_id} - delete report."""
     report_id = 1
-    mock_crud_class = mocker.patch('app.routers.reports.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.reports.scam_crud', autospec=True)
     mock_crud_instance.delete.return_value = True
 
     response = client.delete(f"/reports/{report_id}")
@@ -205,8 +240,7 @@ def test_delete_report(client: TestClient, mock_db: MagicMock, mocker):
 
 def test_delete_report_not_found(client: TestClient, mock_db: MagicMock, mocker):
     """Test DELETE /reports/{report_id} - not found."""
-    mock_crud_class = mocker.patch('app.routers.reports.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.reports.scam_crud', autospec=True)
     mock_crud_instance.delete.return_value = False
 
     response = client.delete("/reports/9999")
@@ -216,10 +250,7 @@ def test_delete_report_not_found(client: TestClient, mock_db: MagicMock, mocker)
 def test_get_linked_persons(client: TestClient, mock_db: MagicMock, mock_link):
     """Test GET /reports/{report_id}/linked_persons - get linked persons."""
     report_id = 1
-    mock_query = mock_db.query.return_value
-    mock_query.options.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.all.return_value = [mock_link]
+    mock_db.execute.return_value.all.return_value = [(report_id, 1, "John Doe", mock_link.role)]
 
     response = client.get(f"/reports/{report_id}/linked_persons")
     assert response.status_code == 200
@@ -228,14 +259,11 @@ def test_get_linked_persons(client: TestClient, mock_db: MagicMock, mock_link):
     assert data[0]["name"] == "John Doe"
     assert data[0]["role"] == "victim"
 
-    mock_db.query.assert_called_with(ReportPersonsLink)
+    mock_db.execute.assert_called_once_with(LINKED_PERSONS_BATCH_STMT, {"report_ids": [report_id]})
 
 def test_get_linked_persons_no_links(client: TestClient, mock_db: MagicMock):
     """Test GET /reports/{report_id}/linked_persons - no links."""
-    mock_query = mock_db.query.return_value
-    mock_query.options.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.all.return_value = []
+    mock_db.execute.return_value.all.return_value = []
 
     response = client.get("/reports/1/linked_persons")
     assert response.status_code == 200
@@ -2,13 +2,14 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock
 from datetime import date, datetime
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.main import app  
 from app.dependencies.db import get_db  
-from app.dependencies.auth import get_current_active_user, get_password_hash  
+from app.dependencies.auth import AuthPrincipal, clear_token_cache, create_access_token, get_current_active_user, get_password_hash  
 from src.models.data_model import Users, UserRole, UserStatus
 from app.model import UserResponse, UserListResponse
-from app.routers.users import CRUDOperations 
+from app.routers.users import CRUDOperations, USER_LIST_COLUMNS
 
 
 @pytest.fixture(scope="function")
@@ -43,11 +44,11 @@ def set_admin_role(mock_db: MagicMock):
     yield
 
 
-def test_get_users(client: TestClient, mock_db: MagicMock, mocker, mock_user, set_admin_role):
+def test_get_users(client: TestClient, mock_async_db: MagicMock, mocker, mock_user, set_admin_role):
     """Test GET /users/ - retrieve list of users with pagination."""
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.read_all.return_value = [mock_user]
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.return_value = [mock_user]
+    mock_async_db.execute.return_value = mocker.MagicMock()  # USERS_VERSION_STMT
 
     response = client.get("/users/?limit=10&offset=0")
     assert response.status_code == 200
@@ -57,7 +58,17 @@ def test_get_users(client: TestClient, mock_db: MagicMock, mocker, mock_user, se
     assert data["users"][0]["first_name"] == "ADMIN"
     assert data["users"][0]["role"] == "ADMIN"
 
-    mock_crud_instance.read_all.assert_called_once_with(mock_db, limit=10, offset=0)
+    mock_crud_instance.read_all_rows_async.assert_awaited_once_with(mock_async_db, USER_LIST_COLUMNS, limit=10, offset=0, after_id=None)
+
+def test_get_users_read_error(client: TestClient, mock_async_db: MagicMock, mocker, set_admin_role):
+    """Test GET /users/ surfaces a failed read as 500 instead of an (ETagged) empty page."""
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_crud_instance.read_all_rows_async.side_effect = SQLAlchemyError("connection lost")
+    mock_async_db.execute.return_value = mocker.MagicMock()  # USERS_VERSION_STMT
+
+    response = client.get("/users/")
+    assert response.status_code == 500
+    assert "etag" not in response.headers
 
 @pytest.mark.parametrize("invalid_params, expected_status", [
     ({"limit": "invalid"}, 422),
@@ -83,8 +94,7 @@ def test_create_user(client: TestClient, mock_db: MagicMock, mocker, mock_user,
     fixed_hash = "fixed_hash_for_test"
     mocker.patch('app.routers.users.get_password_hash', return_value=fixed_hash)
 
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
     mock_user.user_id = 2
     mock_user.first_name = "NEW"
     mock_user.last_name = "USER"
@@ -117,7 +127,7 @@ def test_create_user(client: TestClient, mock_db: MagicMock, mocker, mock_user,
 @pytest.mark.parametrize("invalid_payload, expected_status, expected_detail", [
     ({"password": "testpassword", "first_name": "New"}, 400, "Missing required fields"),
     ({"password": "testpassword", "first_name": "New", "last_name": "User", "contact_no": "12345678", "email": "new@example.com", "role": "INVALID"}, 400, "Invalid role"),
-    ({"password": "testpassword", "first_name": "New", "last_name": "User", "contact_no": "12345678", "email": "new@example.com", "role": "ANALYST", "dob": "invalid"}, 400, "Invalid format for dob"),
+    ({"password": "testpassword", "first_name": "New", "last_name": "User", "contact_no": "12345678", "email": "new@example.com", "role": "ANALYST", "dob": "invalid"}, 422, None),
 ])
 def test_create_user_invalid(client: TestClient, invalid_payload, expected_status, expected_detail, set_admin_role):
     """Test POST /users/ with invalid data (error cases)."""
@@ -131,12 +141,11 @@ def test_update_user(client: TestClient, mock_db: MagicMock, mocker, mock_user,
     user_id = 1
     payload = {"first_name": "Updated Admin", "role": "INVESTIGATION OFFICER", "dob": "1980-05-05"}
 
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
     mock_user.first_name = "UPDATED ADMIN"
     mock_user.dob = date(1980, 5, 5)
     mock_user.role = UserRole.io
-    mock_crud_instance.update.return_value = mock_user
+    mock_crud_instance.update_returning.return_value = mock_user
 
     response = client.put(f"/users/{user_id}", json=payload)
     assert response.status_code == 200
@@ -149,13 +158,39 @@ def test_update_user(client: TestClient, mock_db: MagicMock, mocker, mock_user,
         "role": UserRole.io,
         "dob": date(1980, 5, 5)
     }
-    mock_crud_instance.update.assert_called_once_with(mock_db, user_id, expected_update)
+    mock_crud_instance.update_returning.assert_called_once_with(mock_db, user_id, expected_update)
+
+def test_deactivated_user_rejected_on_next_request(client: TestClient, mock_db: MagicMock, mocker, mock_user):
+    """Test PUT /users/{user_id} - deactivating a user takes effect despite their cached token."""
+    del app.dependency_overrides[get_current_active_user]  # Authenticate through the real token path
+    clear_token_cache()
+    principals = {
+        "admin@example.com": AuthPrincipal(1, "admin@example.com", UserRole.admin, UserStatus.active),
+        "io@example.com": AuthPrincipal(2, "io@example.com", UserRole.io, UserStatus.active),
+    }
+    mocker.patch('app.dependencies.auth._fetch_principal_by_email', side_effect=lambda db, email: principals[email])
+    admin_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin@example.com'})}"}
+    io_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'io@example.com'})}"}
+    mock_db.execute.return_value.all.return_value = []  # ACTIVE_IOS_STMT
+
+    assert client.get("/users/io", headers=io_headers).status_code == 200  # Caches the IO's principal
+
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_user.status = UserStatus.inactive
+    mock_crud_instance.update_returning.return_value = mock_user
+    principals["io@example.com"] = principals["io@example.com"]._replace(status=UserStatus.inactive)
+    response = client.put("/users/2", json={"status": "INACTIVE"}, headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.get("/users/io", headers=io_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+    clear_token_cache()
 
 def test_update_user_not_found(client: TestClient, mock_db: MagicMock, mocker, set_admin_role):
     """Test PUT /users/{user_id} - not found error."""
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = None
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_crud_instance.update_returning.return_value = None
 
     response = client.put("/users/9999", json={"first_name": "Nonexistent"})
     assert response.status_code == 404
@@ -169,21 +204,19 @@ def test_reset_password(client: TestClient, mock_db: MagicMock, mocker, set_admi
     fixed_hash = "fixed_hash_for_test"
     mocker.patch('app.routers.users.get_password_hash', return_value=fixed_hash)
 
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = MagicMock()  # Just needs to be truthy
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_crud_instance.update_returning.return_value = MagicMock()  # Just needs to be truthy
 
     response = client.post(f"/users/{user_id}/reset-password", json=payload)
     assert response.status_code == 204
 
     expected_update = {"password": fixed_hash}
-    mock_crud_instance.update.assert_called_once_with(mock_db, user_id, expected_update)
+    mock_crud_instance.update_returning.assert_called_once_with(mock_db, user_id, expected_update)
 
 def test_reset_password_not_found(client: TestClient, mock_db: MagicMock, mocker, set_admin_role):
     """Test POST /users/{user_id}/reset-password - not found error."""
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
-    mock_crud_instance.update.return_value = None
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
+    mock_crud_instance.update_returning.return_value = None
 
     response = client.post("/users/9999/reset-password", json={"password": "newpassword"})
     assert response.status_code == 404
@@ -193,8 +226,7 @@ def test_delete_user(client: TestClient, mock_db: MagicMock, mocker, set_admin_r
     """Test DELETE /users/{user_id} - delete a user."""
     user_id = 1
 
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
     mock_crud_instance.delete.return_value = True
 
     response = client.delete(f"/users/{user_id}")
@@ -204,8 +236,7 @@ def test_delete_user(client: TestClient, mock_db: MagicMock, mocker, set_admin_r
 
 def test_delete_user_not_found(client: TestClient, mock_db: MagicMock, mocker, set_admin_role):
     """Test DELETE /users/{user_id} - not found error."""
-    mock_crud_class = mocker.patch('app.routers.users.CRUDOperations', autospec=True)
-    mock_crud_instance = mock_crud_class.return_value
+    mock_crud_instance = mocker.patch('app.routers.users.user_crud', autospec=True)
     mock_crud_instance.delete.return_value = False
 
     response = client.delete("/users/9999")